@@ -1,50 +1,123 @@
-from ultralytics import YOLO
 import os
 import json
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from inference import InferenceScheduler
+from zones import ZoneMap
+from postprocess import postprocess
+from model_backends import load_model, BACKEND
+
+# Max seconds a caller waits for a queue slot before giving up
+INFERENCE_SUBMIT_TIMEOUT = float(os.environ.get("FINDIT_SUBMIT_TIMEOUT", "30"))
+# Max seconds an upload waits for the model to finish loading
+MODEL_READY_TIMEOUT = float(os.environ.get("FINDIT_MODEL_READY_TIMEOUT", "300"))
+# Inferences on a blank frame before the engine reports ready
+WARMUP_RUNS = int(os.environ.get("FINDIT_WARMUP_RUNS", "2"))
+
+# Define custom classes to include things NOT in COCO
+CUSTOM_CLASSES = [
+    "person", "wallet", "keys", "key", "bunch of keys", 
+    "cell phone", "smartphone", "laptop", "computer",
+    "computer mouse", "mouse", "keyboard", "bottle", "water bottle", 
+    "cup", "mug", "glasses", "sunglasses", 
+    "remote control", "remote", "book", "backpack", "bag", "handbag", 
+    "headphones", "headset", "earphones", "watch"
+]
+
+# Model lifecycle
+LOADING = "loading"
+WARMING_UP = "warming_up"
+READY = "ready"
+FAILED = "failed"
 
 class AIEngine:
-    def __init__(self, model_path="yolov8s-world.pt", zones_path=None):
+    """
+    Owns the detection model. The model is loaded in a background thread
+    (start()), so the API can serve queries while it loads; `state` and
+    `ready` tell callers when inference is available.
+    """
+
+    def __init__(self, model_path="yolov8s-world.pt", zones_path=None, backend=BACKEND):
         # Resolve zones.json path relative to this file if not provided
         if zones_path is None:
             base_dir = os.path.dirname(os.path.abspath(__file__))
             zones_path = os.path.join(base_dir, "zones.json")
 
-        # Load YOLO model
-        # Try to load YOLO-World first for open vocabulary, fallback to standard YOLOv8n
+        self.backend = backend
         self.model = None
-        
+        self.scheduler = None
+        self.state = LOADING
+        self.load_seconds = None
+        self.ready = threading.Event()
+        # Health as seen by real traffic (reported by /status/model)
+        self.inference_count = 0
+        self.last_inference_at = None
+        self.last_error = None
+        self.last_error_at = None
+        self._loader = None
+
+        self.zones = self.load_zones(zones_path)
+        self.zone_map = ZoneMap(self.zones)
+
+    def start(self):
+        """Load the model in the background; returns immediately."""
+        if self._loader is None:
+            self._loader = threading.Thread(target=self._load, name="model-loader", daemon=True)
+            self._loader.start()
+        return self
+
+    def wait_until_ready(self, timeout=MODEL_READY_TIMEOUT):
+        self.start()
+        return self.ready.wait(timeout) and self.state == READY
+
+    def _load(self):
+        started = time.monotonic()
         try:
-            print("Attempting to load YOLOv8s-Worldv2 model (Open Vocabulary)...")
-            self.model = YOLO("yolov8s-worldv2.pt")
-            
-            # Define custom classes to include things NOT in COCO
-            custom_classes = [
-                "person", "wallet", "keys", "key", "bunch of keys", 
-                "cell phone", "smartphone", "laptop", "computer",
-                "computer mouse", "mouse", "keyboard", "bottle", "water bottle", 
-                "cup", "mug", "glasses", "sunglasses", 
-                "remote control", "remote", "book", "backpack", "bag", "handbag", 
-                "headphones", "headset", "earphones", "watch"
-            ]
-            
-            # Only call set_classes if the method exists (it should for World models)
-            if hasattr(self.model, 'set_classes'):
-                self.model.set_classes(custom_classes)
-                print(f"YOLO-World loaded with custom classes: {custom_classes}")
-            else:
-                print("Loaded model does not support set_classes, using default classes.")
-                
+            model = self._load_model()
+            if model is None:
+                self.state = FAILED
+                return
+
+            self.model = model
+            # All inference goes through one scheduler that owns the model
+            self.scheduler = InferenceScheduler(model)
+
+            self.state = WARMING_UP
+            self.warmup()
+
+            self.load_seconds = time.monotonic() - started
+            self.state = READY
+            print(f"Model ready in {self.load_seconds:.1f}s")
         except Exception as e:
-            print(f"Error loading YOLO-World model: {e}")
-            print("Falling back to standard YOLOv8n...")
-            try:
-                self.model = YOLO("yolov8n.pt")
-                print("YOLOv8n loaded as fallback.")
-            except Exception as e2:
-                print(f"Critical error loading fallback model: {e2}")
-                self.model = None
+            # Fail fast for waiting uploads instead of leaving them "loading"
+            print(f"Model loading failed: {e}")
+            if self.scheduler:
+                self.scheduler.stop()
+            self.model = None
+            self.scheduler = None
+            self.last_error = str(e)
+            self.last_error_at = datetime.now()
+            self.state = FAILED
+        finally:
+            self.ready.set()
 
-        self.zones = self.load_zones(zones_path)
+    def _load_model(self):
+        # ultralytics pulls in torch; it is imported here, off the startup path
+        return load_model(self.backend, CUSTOM_CLASSES)
+
+    def warmup(self, runs=WARMUP_RUNS):
+        # First passes pay for layer fusion and allocator growth; do it before serving
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        for _ in range(runs):
+            try:
+                self.infer(frame)
+            except Exception as e:
+                print(f"Warmup inference failed: {e}")
+                return
 
     def load_zones(self, zones_path):
         if os.path.exists(zones_path):
@@ -57,96 +130,102 @@ class AIEngine:
         return {}
 
     def get_location_description(self, x_center_norm, y_center_norm):
-        # Default fallback
-        location_desc = "未知区域"
-        
-        # Simple horizontal fallback if no zones match
-        if x_center_norm < 0.33:
-            location_desc = "左侧"
-        elif x_center_norm > 0.66:
-            location_desc = "右侧"
+        # Grid-indexed lookup; overlapping zones resolve by "priority"
+        return self.zone_map.describe(x_center_norm, y_center_norm)
+
+    def get_location_descriptions(self, x_centers_norm, y_centers_norm):
+        """Vectorized zone lookup for all box centers of a frame."""
+        return self.zone_map.describe_many(x_centers_norm, y_centers_norm)
+
+    def infer(self, source):
+        """Run the model on one image (path or BGR array) via the shared scheduler."""
+        try:
+            result = self.scheduler.infer(source, timeout=INFERENCE_SUBMIT_TIMEOUT)
+        except Exception as e:
+            self.last_error = str(e)
+            self.last_error_at = datetime.now()
+            raise
+        self.inference_count += 1
+        self.last_inference_at = datetime.now()
+        return result
+
+    def health(self):
+        """Model state from loading and the last real inferences; runs nothing."""
+        if not self.ready.is_set():
+            status, message = "loading", f"Model {self.state.replace('_', ' ')}"
+        elif not self.model:
+            status, message = "error", f"Model not loaded: {self.last_error}" if self.last_error else "Model not loaded"
+        elif self.last_error_at and (not self.last_inference_at or self.last_error_at > self.last_inference_at):
+            status, message = "error", f"Inference failed: {self.last_error}"
         else:
-            location_desc = "中间"
-
-        # Check against defined zones
-        # Prioritize checking smaller zones or specific order if needed
-        # Here we just check all and take the first match or last match
-        for zone_name, zone_data in self.zones.items():
-            if (zone_data['x_min'] <= x_center_norm <= zone_data['x_max'] and
-                zone_data['y_min'] <= y_center_norm <= zone_data['y_max']):
-                return zone_data['description']
-        
-        return location_desc
+            status, message = "ok", "Model operational"
+
+        def iso(value):
+            return value.isoformat() if value else None
+
+        return {
+            "status": status,
+            "message": message,
+            "model_type": "YOLOv8-World",
+            "backend": self.backend,
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "inferences": self.inference_count,
+            "last_inference_at": iso(self.last_inference_at),
+            "last_error": self.last_error,
+            "last_error_at": iso(self.last_error_at),
+            "queue_depth": self.scheduler.queue_depth() if self.scheduler else 0,
+        }
 
     def process_frame(self, frame):
-        if not self.model:
+        if not self.ready.is_set() or not self.model:
             return frame
             
         try:
-            results = self.model(frame)
-            annotated_frame = results[0].plot()
+            result = self.infer(frame)
+            annotated_frame = result.plot()
             return annotated_frame
         except Exception as e:
             print(f"Inference error: {e}")
             return frame
 
-    def analyze_image(self, image_path):
+    def detect_frame(self, frame, zone_map=None):
+        """
+        Detections (pixel bboxes) for one BGR frame, or None if inference
+        failed or the model is still loading. Locations come from `zone_map`
+        (the camera's zones), defaulting to zones.json.
+        """
+        if not self.ready.is_set():
+            return None
         if not self.model:
-            return [], image_path
-            
+            return []
+
         try:
-            results = self.model(image_path)
-            detected_items = []
-            
-            # We process the first result (since we infer one image)
-            result = results[0]
-            
-            # Save annotated image
-            annotated_frame = result.plot()
-            # Save to the same directory but with a suffix
-            # e.g. images/xxx.jpg -> images/xxx_annotated.jpg
-            base_name, ext = os.path.splitext(image_path)
-            annotated_path = f"{base_name}_annotated{ext}"
-            
-            # Ultralytics plot() returns a numpy array (BGR), we need to save it.
-            # We can use PIL or cv2. Since we have Pillow installed:
-            from PIL import Image
-            import numpy as np
-            
-            # Convert BGR (OpenCV format) to RGB
-            im_rgb = annotated_frame[..., ::-1] 
-            im = Image.fromarray(im_rgb)
-            im.save(annotated_path)
-    
-            boxes = result.boxes
-            img_width = result.orig_shape[1]
-            img_height = result.orig_shape[0]
-    
-            for box in boxes:
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                name = self.model.names[cls]
-                
-                # Calculate normalized center
-                x1, y1, x2, y2 = box.xyxy[0]
-                x_center = (x1 + x2) / 2
-                y_center = (y1 + y2) / 2
-                
-                x_center_norm = float(x_center) / img_width
-                y_center_norm = float(y_center) / img_height
-                
-                location_desc = self.get_location_description(x_center_norm, y_center_norm)
-    
-                if conf > 0.15: # Lowered Confidence threshold for Open Vocabulary
-                    detected_items.append({
-                        "name": name,
-                        "confidence": conf,
-                        "location_desc": location_desc,
-                        "bbox": box.xyxy[0].tolist(),
-                        "annotated_path": annotated_path # Return this so API knows
-                    })
-                        
-            return detected_items, annotated_path
+            result = self.infer(frame)
+            return postprocess(result, self.model.names, zone_map or self.zone_map)
+        except Exception as e:
+            print(f"Inference error: {e}")
+            return None
+
+    def analyze_image(self, image_path, zone_map=None):
+        """
+        (detections, (width, height)) for a stored upload. Raises when the
+        model is unavailable or inference fails, so the ingest job is marked
+        failed instead of saving a capture without detections.
+        """
+        # Uploads that arrive during startup wait for the model
+        if not self.wait_until_ready():
+            raise RuntimeError(f"Model not available ({self.state})")
+
+        try:
+            result = self.infer(image_path)
+
+            # Annotated images are rendered on demand from the stored
+            # detections (see render.py), so no plot() here.
+            detected_items = postprocess(result, self.model.names, zone_map or self.zone_map)
+
+            img_height, img_width = result.orig_shape[:2]
+            return detected_items, (img_width, img_height)
         except Exception as e:
             print(f"Analysis error: {e}")
-            return [], image_path
+            raise
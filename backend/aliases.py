@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# How often (seconds) to check aliases.json for changes
+RELOAD_CHECK_INTERVAL = float(os.environ.get("FINDIT_ALIAS_RELOAD_INTERVAL", "1.0"))
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one pass over the text finds every pattern."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for pattern in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(pattern)
+
+        # Breadth-first construction of failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text):
+        """Yield (start, end, pattern) for every occurrence in `text`."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern in self._out[node]:
+                yield i + 1 - len(pattern), i + 1, pattern
+
+
+class _Snapshot:
+    """Immutable lookup tables built from one version of aliases.json."""
+
+    def __init__(self, aliases_map):
+        self.aliases_map = aliases_map
+        self.exact = {}      # class name or alias -> [class names]
+        self.partial = {}    # any substring of an alias -> [class names]
+        terms = {}           # class name or alias -> [class names], for the automaton
+
+        for eng_name, alias_list in aliases_map.items():
+            key = eng_name.lower()
+            self._add(self.exact, key, eng_name)
+            self._add(terms, key, eng_name)
+            for alias in alias_list:
+                alias = alias.lower()
+                self._add(self.exact, alias, eng_name)
+                self._add(terms, alias, eng_name)
+                for i in range(len(alias)):
+                    for j in range(i + 1, len(alias) + 1):
+                        self._add(self.partial, alias[i:j], eng_name)
+
+        self.terms = terms
+        self.automaton = AhoCorasick(terms)
+
+    @staticmethod
+    def _add(table, key, eng_name):
+        names = table.setdefault(key, [])
+        if eng_name not in names:
+            names.append(eng_name)
+
+
+class AliasIndex:
+    """
+    Alias resolution for /query, precompiled from aliases.json.
+
+    Lookups go, in order: exact match on a class name or alias (dict),
+    query is part of an alias ("钱" -> "钱包", dict of alias substrings),
+    query contains aliases ("我的钱包" -> "钱包", Aho-Corasick automaton).
+    The index is rebuilt and swapped in atomically when the file's mtime
+    changes, so aliases can be edited without restarting the server.
+    """
+
+    def __init__(self, path, check_interval=RELOAD_CHECK_INTERVAL, on_reload=None):
+        self.path = path
+        self.check_interval = check_interval
+        # Called with the new aliases map after every successful reload
+        self.on_reload = on_reload
+        self._snapshot = _Snapshot({})
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload_if_changed(force=True)
+
+    @property
+    def aliases_map(self):
+        return self._snapshot.aliases_map
+
+    def reload_if_changed(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+
+        with self._lock:
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return False
+            if not force and mtime == self._mtime:
+                return False
+
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    snapshot = _Snapshot(json.load(f))
+            except Exception as e:
+                # Keep serving the previous version
+                print(f"Error loading aliases: {e}")
+                return False
+
+            self._snapshot = snapshot
+            self._mtime = mtime
+            print(f"Loaded {len(snapshot.aliases_map)} alias groups from {self.path}")
+
+        if self.on_reload:
+            self.on_reload(snapshot.aliases_map)
+        return True
+
+    def resolve(self, q_lower):
+        """
+        Map a lower-cased query to English class names.
+        Returns (target_names, found_alias); without a match the query itself
+        is returned as the only target.
+        """
+        self.reload_if_changed()
+        snapshot = self._snapshot
+
+        names = snapshot.exact.get(q_lower) or snapshot.partial.get(q_lower)
+        if names:
+            return list(names), True
+
+        # Aliases inside a longer query; keep leftmost-longest, non-overlapping
+        matches = sorted(snapshot.automaton.find_all(q_lower), key=lambda m: (m[0], m[0] - m[1]))
+        target_names = []
+        pos = 0
+        for start, end, term in matches:
+            if start < pos:
+                continue
+            # Latin terms must be whole words ("cup" should not match "cupboard")
+            if term.isascii() and ((start > 0 and q_lower[start - 1].isalnum()) or
+                                   (end < len(q_lower) and q_lower[end].isalnum())):
+                continue
+            pos = end
+            for eng_name in snapshot.terms[term]:
+                if eng_name not in target_names:
+                    target_names.append(eng_name)
+
+        if target_names:
+            return target_names, True
+        return [q_lower], False
+
+    def display_name(self, name):
+        """Chinese display name for a class, e.g. "杯子 (cup)"."""
+        alias_list = self._snapshot.aliases_map.get(name)
+        if alias_list:
+            return f"{alias_list[0]} ({name})"
+        return name
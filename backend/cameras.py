@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+
+import requests
+
+from mjpeg import MJPEGParser, iter_frames
+from zones import ZoneMap
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Camera registry; without it every upload uses zones.json (single room)
+CAMERAS_FILE = os.environ.get("FINDIT_CAMERAS_FILE", os.path.join(BASE_DIR, "cameras.json"))
+# Seconds to wait for a still from a camera stream on scheduled captures
+CAPTURE_TIMEOUT = float(os.environ.get("FINDIT_CAPTURE_TIMEOUT", "10"))
+
+
+class Camera:
+    """
+    One registered camera. cameras.json maps camera ids to:
+      "name"              display name (default: the id)
+      "stream_url"        MJPEG stream, e.g. "http://192.168.31.50:81/stream"
+      "zones"             zones.json-style object, or a path to such a file
+                          relative to cameras.json (default: zones.json)
+      "capture_interval"  seconds between stills the backend pulls from
+                          stream_url itself; 0 (default) when the camera
+                          uploads on its own schedule
+    """
+
+    def __init__(self, camera_id, data, default_zone_map, base_dir=BASE_DIR):
+        self.id = camera_id
+        self.name = data.get("name", camera_id)
+        self.stream_url = data.get("stream_url")
+        self.capture_interval = float(data.get("capture_interval", 0))
+
+        zones = data.get("zones")
+        if isinstance(zones, str) and not os.path.exists(os.path.join(base_dir, zones)):
+            print(f"Zones file {zones} of camera {camera_id} not found, using zones.json")
+            self.zone_map = default_zone_map
+        elif isinstance(zones, str):
+            self.zone_map = ZoneMap.load(os.path.join(base_dir, zones))
+        elif isinstance(zones, dict):
+            self.zone_map = ZoneMap(zones)
+        else:
+            self.zone_map = default_zone_map
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "stream_url": self.stream_url,
+            "capture_interval": self.capture_interval,
+            "zones": self.zone_map.all_descriptions(),
+        }
+
+
+class CameraRegistry:
+    """Cameras from cameras.json, each with its own zone map."""
+
+    def __init__(self, default_zone_map, path=CAMERAS_FILE):
+        self.path = path
+        self.default_zone_map = default_zone_map
+        self.cameras = self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading cameras: {e}")
+            return {}
+
+        base_dir = os.path.dirname(os.path.abspath(self.path))
+        cameras = {camera_id: Camera(camera_id, entry, self.default_zone_map, base_dir)
+                   for camera_id, entry in data.items()}
+        print(f"Loaded {len(cameras)} cameras from {self.path}")
+        return cameras
+
+    def get(self, camera_id):
+        return self.cameras.get(camera_id) if camera_id else None
+
+    def by_stream_url(self, url):
+        for camera in self.cameras.values():
+            if camera.stream_url == url:
+                return camera
+        return None
+
+    def zone_map(self, camera_id):
+        """The camera's zone map; zones.json for unknown or missing ids."""
+        camera = self.get(camera_id)
+        return camera.zone_map if camera else self.default_zone_map
+
+    def all_descriptions(self):
+        """Location texts of every camera, for the search index."""
+        descriptions = self.default_zone_map.all_descriptions()
+        for camera in self.cameras.values():
+            descriptions += camera.zone_map.all_descriptions()
+        return list(dict.fromkeys(descriptions))
+
+    def __iter__(self):
+        return iter(self.cameras.values())
+
+    def __len__(self):
+        return len(self.cameras)
+
+
+def grab_still(url, timeout=CAPTURE_TIMEOUT):
+    """First complete JPEG from an MJPEG stream, or None."""
+    try:
+        with requests.get(url, stream=True, timeout=timeout) as r:
+            if r.status_code != 200:
+                print(f"Capture from {url} returned status code: {r.status_code}")
+                return None
+            boundary = MJPEGParser.boundary_from_content_type(r.headers.get("Content-Type"))
+            for jpg in iter_frames(r.iter_content(chunk_size=16384), boundary=boundary):
+                return jpg
+    except Exception as e:
+        print(f"Capture from {url} failed: {e}")
+    return None
+
+
+class CaptureScheduler:
+    """
+    Pulls stills from cameras that have a capture_interval and hands them
+    to `on_capture(camera, jpg)`; one thread per camera, so a slow or
+    offline camera never delays the others.
+    """
+
+    def __init__(self, registry, on_capture):
+        self.registry = registry
+        self.on_capture = on_capture
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for camera in self.registry:
+            if camera.capture_interval > 0 and camera.stream_url:
+                thread = threading.Thread(target=self._run, args=(camera,), name=f"capture-{camera.id}",
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self, camera):
+        while not self._stopped.wait(camera.capture_interval):
+            jpg = grab_still(camera.stream_url)
+            if jpg is None:
+                continue
+            try:
+                self.on_capture(camera, jpg)
+            except Exception as e:
+                print(f"Scheduled capture for {camera.id} failed: {e}")
@@ -0,0 +1,66 @@
+import hashlib
+import os
+
+# YOLO-World's set_classes() runs the CLIP text encoder over the whole
+# vocabulary; the resulting embeddings are cached here per model + vocabulary
+EMBEDDING_CACHE_DIR = os.environ.get("FINDIT_EMBEDDING_CACHE_DIR", "model_cache")
+
+
+def model_digest(model):
+    """SHA-256 of the loaded weights file (falls back to its name)."""
+    ckpt_path = getattr(model, "ckpt_path", None)
+    if not ckpt_path or not os.path.isfile(ckpt_path):
+        return str(ckpt_path or getattr(model, "model_name", ""))
+    digest = hashlib.sha256()
+    with open(ckpt_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def vocabulary_key(model, classes):
+    """Identifies one set of weights with one class list."""
+    key = hashlib.sha256("\n".join([model_digest(model), *classes]).encode("utf-8")).hexdigest()
+    return key[:24]
+
+
+def cache_path(model, classes, cache_dir=EMBEDDING_CACHE_DIR):
+    return os.path.join(cache_dir, f"txt_feats_{vocabulary_key(model, classes)}.pt")
+
+
+def _apply(model, classes, txt_feats):
+    # What YOLO.set_classes() / WorldModel.set_classes() leave behind
+    inner = model.model
+    device = next(inner.parameters()).device
+    inner.txt_feats = txt_feats.to(device)
+    inner.model[-1].nc = len(classes)
+    inner.names = list(classes)
+    if getattr(model, "predictor", None):
+        model.predictor.model.names = list(classes)
+
+
+def set_classes_cached(model, classes, cache_dir=EMBEDDING_CACHE_DIR):
+    """
+    model.set_classes(classes), but the text embeddings are loaded from disk
+    when this model and vocabulary were seen before. Returns True on a cache hit.
+    """
+    import torch
+
+    classes = list(classes)
+    path = cache_path(model, classes, cache_dir)
+    if os.path.exists(path):
+        try:
+            _apply(model, classes, torch.load(path, map_location="cpu"))
+            return True
+        except Exception as e:
+            print(f"Ignoring unreadable embedding cache {path}: {e}")
+
+    model.set_classes(list(classes))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        torch.save(model.model.txt_feats.detach().cpu(), tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Could not cache class embeddings: {e}")
+    return False
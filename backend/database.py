@@ -1,26 +1,345 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from sqlalchemy import (create_engine, event, inspect, text, Column, Integer, Float, String, DateTime, Boolean,
+                        ForeignKey, Index)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from concurrent.futures import Future
 from datetime import datetime
+import json
+import os
+import queue
+import threading
+import time
 
-DATABASE_URL = "sqlite:///./findit.db"
+from metrics import time_stage
+
+DATABASE_PATH = "./findit.db"
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+
+# "production": WAL journal, synchronous=NORMAL, batched writes and a
+# separate read-only connection pool for queries. Anything else keeps the
+# plain single-connection-at-a-time setup.
+STORAGE_MODE = os.environ.get("FINDIT_STORAGE_MODE", "simple")
+PRODUCTION = STORAGE_MODE == "production"
+
+# Writer batching: how long to wait for more writes to share a transaction
+WRITE_BATCH_WAIT_MS = float(os.environ.get("FINDIT_WRITE_BATCH_WAIT_MS", "20" if PRODUCTION else "0"))
+WRITE_BATCH_SIZE = int(os.environ.get("FINDIT_WRITE_BATCH_SIZE", "64"))
+READ_POOL_SIZE = int(os.environ.get("FINDIT_READ_POOL_SIZE", "8"))
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    if PRODUCTION:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+if PRODUCTION:
+    # Readers never take the write lock; with WAL they don't block the writer
+    read_engine = create_engine(
+        f"sqlite:///file:{DATABASE_PATH}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        pool_size=READ_POOL_SIZE,
+        max_overflow=READ_POOL_SIZE,
+    )
+
+    @event.listens_for(read_engine, "connect")
+    def _set_read_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
-class Item(Base):
-    __tablename__ = "items"
+class Capture(Base):
+    """One row per stored image."""
+    __tablename__ = "captures"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    location = Column(String)
+    id = Column(Integer, primary_key=True)
+    image_path = Column(String, nullable=False, unique=True)
+    width = Column(Integer)
+    height = Column(Integer)
+    # True when a pre-rendered _annotated copy exists on disk (legacy uploads)
+    annotated = Column(Boolean, nullable=False, default=False)
+    # URL the API hands out for this capture, decided at ingest time
+    image_url = Column(String)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    # Uploading camera (X-Camera-Id header or client address)
+    source = Column(String)
+    # Camera id the upload named (cameras.json); None for unidentified uploads
+    camera_id = Column(String)
+    # 64-bit dHash of the frame (signed for SQLite); see dedup.py
+    phash = Column(Integer)
+    # Latest upload that showed the same scene; duplicates only move this forward
+    last_seen_at = Column(DateTime)
+    # Downsampled/recompressed by the storage compactor (see storage.py)
+    archived = Column(Boolean, default=False)
+
+    detections = relationship("Detection", back_populates="capture", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_captures_source_id", "source", "id"),
+        Index("ix_captures_camera_id_timestamp", "camera_id", "timestamp"),
+    )
+
+class Detection(Base):
+    """One detected object in a capture. Box coordinates are normalized to 0-1."""
+    __tablename__ = "detections"
+
+    id = Column(Integer, primary_key=True)
+    capture_id = Column(Integer, ForeignKey("captures.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=False)
+    confidence = Column(Float)
+    x1 = Column(Float)
+    y1 = Column(Float)
+    x2 = Column(Float)
+    y2 = Column(Float)
+    zone = Column(String)
+    # Copy of the capture time so per-class history queries stay index-only
     timestamp = Column(DateTime, default=datetime.utcnow)
-    image_path = Column(String)
+    # Copy of the capture's camera, for the same reason
+    camera_id = Column(String)
+
+    capture = relationship("Capture", back_populates="detections")
+
+    __table_args__ = (
+        Index("ix_detections_name_timestamp", "name", "timestamp"),
+        Index("ix_detections_name_confidence", "name", "confidence"),
+        Index("ix_detections_capture_id", "capture_id"),
+        Index("ix_detections_camera_name_timestamp", "camera_id", "name", "timestamp"),
+    )
+
+    def pixel_bbox(self):
+        w = self.capture.width or 1
+        h = self.capture.height or 1
+        return [self.x1 * w, self.y1 * h, self.x2 * w, self.y2 * h]
+
+class LastSeen(Base):
+    """
+    Latest sighting of each class in each zone of each camera, maintained
+    at ingest so "where is it now" is a primary-key lookup instead of a
+    history scan. Rooms may reuse zone names, hence the camera in the key.
+    """
+    __tablename__ = "last_seen"
+
+    name = Column(String, primary_key=True)
+    zone = Column(String, primary_key=True, default="")
+    camera_id = Column(String, primary_key=True, default="")
+    capture_id = Column(Integer, ForeignKey("captures.id", ondelete="CASCADE"), nullable=False)
+    confidence = Column(Float)
+    timestamp = Column(DateTime, nullable=False)
+    image_url = Column(String)
+
+def _upsert_last_seen(db, name, zone, camera_id, capture_id, confidence, timestamp, image_url):
+    stmt = sqlite_insert(LastSeen).values(
+        name=name,
+        zone=zone or "",
+        camera_id=camera_id or "",
+        capture_id=capture_id,
+        confidence=confidence,
+        timestamp=timestamp,
+        image_url=image_url,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[LastSeen.name, LastSeen.zone, LastSeen.camera_id],
+        set_={
+            "capture_id": stmt.excluded.capture_id,
+            "confidence": stmt.excluded.confidence,
+            "timestamp": stmt.excluded.timestamp,
+            "image_url": stmt.excluded.image_url,
+        },
+        # Never let an older capture overwrite a newer sighting
+        where=stmt.excluded.timestamp >= LastSeen.timestamp,
+    ))
+
+def save_capture(db, capture):
+    """
+    Writer op: insert a capture with its detections and move the matching
+    last_seen rows forward. Returns the new capture id, or None when a
+    capture of the same image file already exists (a byte-identical upload
+    processed at the same time got here first).
+    """
+    # Checked here rather than left to the unique index: the single writer
+    # serializes this, and a failed insert would fail the whole batch
+    if db.query(Capture.id).filter(Capture.image_path == capture.image_path).first():
+        return None
+    db.add(capture)
+    db.flush()
+
+    for det in capture.detections:
+        _upsert_last_seen(db, det.name, det.zone, capture.camera_id, capture.id, det.confidence, det.timestamp,
+                          capture.image_url)
+    return capture.id
+
+def extend_capture(db, capture_id, seen_at):
+    """
+    Writer op for a duplicate upload: the scene of `capture_id` was seen
+    again at `seen_at`. Moves its last_seen rows forward without storing a
+    new capture. Returns False if the capture no longer exists.
+    """
+    capture = db.get(Capture, capture_id)
+    if capture is None:
+        return False
+    capture.last_seen_at = seen_at
+    for det in capture.detections:
+        _upsert_last_seen(db, det.name, det.zone, capture.camera_id, capture.id, det.confidence, seen_at,
+                          capture.image_url)
+    return True
+
+def capture_image_url(image_path, annotated=False, has_boxes=False):
+    """
+    Best image URL for a capture: the legacy pre-rendered copy, the lazily
+    rendered /annotated view, or the raw image.
+    """
+    filename = os.path.basename(image_path)
+    if annotated:
+        base_name, ext = os.path.splitext(filename)
+        return f"/images/{base_name}_annotated{ext}"
+    if has_boxes:
+        return f"/annotated/{filename}"
+    return f"/images/{filename}"
+
+def add_missing_columns():
+    # create_all() does not alter existing tables; add columns and indexes
+    # introduced after a findit.db was first created.
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def _image_size(image_path):
+    try:
+        from PIL import Image
+        with Image.open(image_path) as im:
+            return im.size
+    except Exception:
+        return None, None
+
+def migrate_legacy_items():
+    """
+    Move rows from the old flat `items` table (one row per detection, image
+    path repeated) into captures/detections, then rename it to items_legacy.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table("items"):
+        return
+
+    columns = {c["name"] for c in inspector.get_columns("items")}
+    select_cols = ["name", "location", "timestamp", "image_path"]
+    select_cols += [c for c in ("confidence", "bbox") if c in columns]
+
+    with engine.begin() as conn:
+        query = text(f"SELECT {', '.join(select_cols)} FROM items ORDER BY timestamp").columns(timestamp=DateTime)
+        rows = conn.execute(query).mappings().all()
+        print(f"Migrating {len(rows)} legacy items to captures/detections...")
+
+        captures = {}
+        for row in rows:
+            image_path = row["image_path"]
+            if image_path not in captures:
+                width, height = _image_size(image_path)
+                base_name, ext = os.path.splitext(image_path)
+                annotated = os.path.exists(f"{base_name}_annotated{ext}")
+                result = conn.execute(
+                    Capture.__table__.insert().values(
+                        image_path=image_path,
+                        width=width,
+                        height=height,
+                        annotated=annotated,
+                        # image_url is set by backfill_image_urls() once the
+                        # detections are in: only migrated bboxes get /annotated
+                        timestamp=row["timestamp"],
+                    )
+                )
+                captures[image_path] = (result.inserted_primary_key[0], width, height)
+
+            capture_id, width, height = captures[image_path]
+            box = [None] * 4
+            if row.get("bbox") and width and height:
+                x1, y1, x2, y2 = json.loads(row["bbox"])
+                box = [x1 / width, y1 / height, x2 / width, y2 / height]
+
+            conn.execute(
+                Detection.__table__.insert().values(
+                    capture_id=capture_id,
+                    name=row["name"],
+                    confidence=row.get("confidence"),
+                    x1=box[0], y1=box[1], x2=box[2], y2=box[3],
+                    zone=row["location"],
+                    timestamp=row["timestamp"],
+                )
+            )
+
+        conn.execute(text("ALTER TABLE items RENAME TO items_legacy"))
+
+def backfill_image_urls():
+    # Captures stored before image_url existed
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT c.id, c.image_path, c.annotated, "
+            "EXISTS (SELECT 1 FROM detections d WHERE d.capture_id = c.id AND d.x1 IS NOT NULL) "
+            "FROM captures c WHERE c.image_url IS NULL"
+        )).all()
+        for capture_id, image_path, annotated, has_boxes in rows:
+            conn.execute(
+                Capture.__table__.update().where(Capture.id == capture_id)
+                .values(image_url=capture_image_url(image_path, bool(annotated), bool(has_boxes)))
+            )
+
+def drop_outdated_last_seen():
+    # last_seen keyed by (class, zone) predates cameras; the primary key
+    # can't be altered in place, and the table is derived data anyway,
+    # so drop it and let backfill_last_seen() rebuild it
+    inspector = inspect(engine)
+    if not inspector.has_table("last_seen"):
+        return
+    if "camera_id" not in {c["name"] for c in inspector.get_columns("last_seen")}:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE last_seen"))
+
+def backfill_last_seen():
+    # Databases that predate last_seen: take the newest detection per (class, zone, camera)
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM last_seen LIMIT 1")).first():
+            return
+        conn.execute(text(
+            "INSERT INTO last_seen (name, zone, camera_id, capture_id, confidence, timestamp, image_url) "
+            "SELECT d.name, COALESCE(d.zone, ''), COALESCE(c.camera_id, ''), d.capture_id, d.confidence, "
+            "       COALESCE(c.last_seen_at, d.timestamp), c.image_url "
+            "FROM detections d JOIN captures c ON c.id = d.capture_id "
+            "WHERE d.id = (SELECT d2.id FROM detections d2 JOIN captures c2 ON c2.id = d2.capture_id "
+            "              WHERE d2.name = d.name AND COALESCE(d2.zone, '') = COALESCE(d.zone, '') "
+            "                AND COALESCE(c2.camera_id, '') = COALESCE(c.camera_id, '') "
+            "              ORDER BY d2.timestamp DESC, d2.id DESC LIMIT 1)"
+        ))
 
 def init_db():
+    drop_outdated_last_seen()
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    migrate_legacy_items()
+    backfill_image_urls()
+    backfill_last_seen()
+    db_writer.start()
 
 def get_db():
     db = SessionLocal()
@@ -28,3 +347,105 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    # Read-only session for queries (pooled read-only connections in production mode)
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+class DbWriter:
+    """
+    Single writer thread for the database. Write operations are callables
+    taking a Session; operations that arrive within `max_wait_ms` of each
+    other share one transaction, so detections from many captures are
+    flushed as bulk INSERTs with a single commit and there is no lock
+    contention between writers.
+    """
+
+    def __init__(self, session_factory, max_batch_size=WRITE_BATCH_SIZE, max_wait_ms=WRITE_BATCH_WAIT_MS):
+        self.session_factory = session_factory
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, op):
+        """Queue op(session); returns a Future with op's return value after commit."""
+        self.start()
+        future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def write(self, op):
+        """Blocking helper: submit and wait for the commit."""
+        return self.submit(op).result()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        live = [(op, future) for op, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+
+        db = self.session_factory()
+        try:
+            with time_stage("db_commit"):
+                results = [op(db) for op, _ in live]
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            db.close()
+            if len(live) == 1:
+                live[0][1].set_exception(e)
+                return
+            # Retry one by one so a bad write doesn't fail the whole batch
+            for op, future in live:
+                self._run_single(op, future)
+            return
+        finally:
+            db.close()
+
+        for (_, future), result in zip(live, results):
+            future.set_result(result)
+
+    def _run_single(self, op, future):
+        db = self.session_factory()
+        try:
+            with time_stage("db_commit"):
+                result = op(db)
+                db.commit()
+            future.set_result(result)
+        except Exception as e:
+            db.rollback()
+            future.set_exception(e)
+        finally:
+            db.close()
+
+# All writes go through this writer
+db_writer = DbWriter(SessionLocal)
@@ -0,0 +1,187 @@
+import os
+import threading
+from datetime import datetime
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from database import Capture
+
+# Max differing bits (out of 64) for two frames to count as the same scene;
+# a negative value disables dedup
+DEDUP_MAX_DISTANCE = int(os.environ.get("FINDIT_DEDUP_DISTANCE", "4"))
+# Fraction of thumbnail pixels that may change before a frame counts as new.
+# The hash alone misses small objects: a wallet put down in a 1600x1200
+# frame flips only ~2 of its 64 bits.
+DEDUP_CHANGE_THRESHOLD = float(os.environ.get("FINDIT_DEDUP_CHANGE_THRESHOLD", "0.001"))
+# Per-pixel gray level change that counts as "changed" (0-255)
+DEDUP_PIXEL_DELTA = int(os.environ.get("FINDIT_DEDUP_PIXEL_DELTA", "25"))
+# Seconds a stored capture may be reused before the model runs again
+DEDUP_MAX_AGE = float(os.environ.get("FINDIT_DEDUP_MAX_AGE", "60"))
+HASH_SIZE = 8
+THUMB_SIZE = (160, 120)
+
+
+def fingerprint(image_path, hash_size=HASH_SIZE, thumb_size=THUMB_SIZE):
+    """
+    (dhash, thumbnail) of an image from a single decode. The 64-bit
+    difference hash records whether each pixel of a (hash_size+1) x hash_size
+    grayscale copy is brighter than its left neighbour; it is robust to
+    JPEG noise and exposure changes and cheap to store. The blurred
+    thumbnail is compared pixel by pixel (like motion.MotionDetector) to
+    catch small objects the hash can't see.
+    """
+    with Image.open(image_path) as im:
+        # JPEGs are decoded directly at a reduced DCT scale
+        im.draft("L", (thumb_size[0] * 2, thumb_size[1] * 2))
+        gray = im.convert("L")
+        small = gray.resize((hash_size + 1, hash_size), Image.BILINEAR)
+        thumb = np.asarray(gray.resize(thumb_size, Image.BILINEAR))
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big"), cv2.GaussianBlur(thumb, (3, 3), 0)
+
+
+def dhash(image_path, hash_size=HASH_SIZE):
+    """64-bit difference hash of an image; see fingerprint()."""
+    return fingerprint(image_path, hash_size)[0]
+
+
+def changed_fraction(a, b, pixel_delta=DEDUP_PIXEL_DELTA):
+    """Fraction of pixels that differ by more than `pixel_delta` between two thumbnails."""
+    return np.count_nonzero(cv2.absdiff(a, b) > pixel_delta) / a.size
+
+
+def to_signed(value):
+    """Unsigned 64-bit hash -> SQLite INTEGER range."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value):
+    return value & ((1 << 64) - 1)
+
+
+def hamming(a, b):
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count("1")
+
+
+class LastCapture:
+    """What the dedup stage remembers about a source's latest stored capture."""
+
+    def __init__(self, capture_id, phash, filename, timestamp, detected, thumb=None, image_path=None):
+        self.capture_id = capture_id
+        self.phash = phash
+        self.filename = filename
+        self.timestamp = timestamp
+        self.detected = detected
+        # Loaded from image_path on first use after a restart
+        self.thumb = thumb
+        self.image_path = image_path
+
+    def thumbnail(self):
+        if self.thumb is None and self.image_path:
+            try:
+                self.thumb = fingerprint(self.image_path)[1]
+            except Exception as e:
+                print(f"Could not load {self.image_path} for dedup: {e}")
+                self.image_path = None
+        return self.thumb
+
+
+def _last_capture(capture):
+    detected = [
+        {
+            "name": det.name,
+            "confidence": det.confidence,
+            "location_desc": det.zone,
+            "bbox": det.pixel_bbox() if det.x1 is not None else None,
+        }
+        for det in capture.detections
+    ]
+    phash = to_unsigned(capture.phash) if capture.phash is not None else None
+    return LastCapture(capture.id, phash, os.path.basename(capture.image_path),
+                       capture.timestamp, detected, image_path=capture.image_path)
+
+
+def load_last_capture(db, source):
+    """Latest hashed capture of `source` from the database, or None."""
+    capture = (db.query(Capture)
+               .filter(Capture.source == source, Capture.phash.isnot(None))
+               .order_by(Capture.id.desc())
+               .first())
+    return _last_capture(capture) if capture else None
+
+
+def load_capture(db, image_path):
+    """The capture stored for exactly this file, or None."""
+    capture = db.query(Capture).filter(Capture.image_path == image_path).first()
+    return _last_capture(capture) if capture else None
+
+
+class DedupIndex:
+    """
+    Last stored capture per source (camera), so an upload that shows the
+    same scene can reuse its detections instead of running inference.
+    Frames are always compared with the last *stored* capture, so slow
+    drift eventually produces a new capture, and a capture is reused for at
+    most `max_age` seconds.
+    """
+
+    def __init__(self, session_factory, max_distance=DEDUP_MAX_DISTANCE,
+                 change_threshold=DEDUP_CHANGE_THRESHOLD, max_age=DEDUP_MAX_AGE):
+        self.session_factory = session_factory
+        self.max_distance = max_distance
+        self.change_threshold = change_threshold
+        self.max_age = max_age
+        self._last = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_distance >= 0
+
+    def _get(self, source):
+        with self._lock:
+            if source in self._last:
+                return self._last[source]
+        # First upload from this source since startup: ask the database
+        db = self.session_factory()
+        try:
+            last = load_last_capture(db, source)
+        finally:
+            db.close()
+        with self._lock:
+            return self._last.setdefault(source, last)
+
+    def exact(self, image_path):
+        """
+        Capture of a byte-identical earlier upload: content-addressed
+        storage gives it the same path (see storage.py).
+        """
+        db = self.session_factory()
+        try:
+            return load_capture(db, image_path)
+        finally:
+            db.close()
+
+    def match(self, source, phash, thumb, now=None):
+        """The source's last capture if the frame (`phash`, `thumb`) shows the same scene."""
+        if not self.enabled:
+            return None
+        last = self._get(source)
+        if last is None or hamming(last.phash, phash) > self.max_distance:
+            return None
+        if ((now or datetime.now()) - last.timestamp).total_seconds() > self.max_age:
+            return None
+        reference = last.thumbnail()
+        if reference is None or changed_fraction(reference, thumb) > self.change_threshold:
+            return None
+        return last
+
+    def remember(self, source, last):
+        with self._lock:
+            current = self._last.get(source)
+            # Ingest workers can finish out of order; keep the newest capture
+            if current is None or last.timestamp >= current.timestamp:
+                self._last[source] = last
@@ -0,0 +1,246 @@
+import re
+
+from sqlalchemy import bindparam, text, DateTime
+from sqlalchemy.orm import Session
+
+from database import engine
+from search import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# SQLite's unicode61 tokenizer would keep "茶几上" as one token, so CJK text
+# is segmented here into overlapping bigrams (single characters stay as
+# they are) before it reaches FTS5. Latin words are indexed as-is.
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[0-9a-z]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+FTS_SCHEMA = [
+    # Searchable text per class (name + aliases) and per zone description
+    "CREATE TABLE IF NOT EXISTS class_terms (name TEXT PRIMARY KEY, terms TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS zone_terms (zone TEXT PRIMARY KEY, terms TEXT NOT NULL)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS detections_fts USING fts5(name_terms, zone_terms, tokenize='unicode61')",
+    # Index maintenance lives in the database, so every writer keeps it current
+    """
+    CREATE TRIGGER IF NOT EXISTS detections_fts_insert AFTER INSERT ON detections BEGIN
+        INSERT INTO detections_fts (rowid, name_terms, zone_terms) VALUES (
+            new.id,
+            COALESCE((SELECT terms FROM class_terms WHERE name = new.name), new.name),
+            COALESCE((SELECT terms FROM zone_terms WHERE zone = new.zone), new.zone)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS detections_fts_delete AFTER DELETE ON detections BEGIN
+        DELETE FROM detections_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+REBUILD_SQL = [
+    "DELETE FROM detections_fts",
+    """
+    INSERT INTO detections_fts (rowid, name_terms, zone_terms)
+    SELECT d.id,
+           COALESCE(ct.terms, d.name),
+           COALESCE(zt.terms, d.zone)
+    FROM detections d
+    LEFT JOIN class_terms ct ON ct.name = d.name
+    LEFT JOIN zone_terms zt ON zt.zone = d.zone
+    """,
+]
+
+# Re-index only the detections of classes or zones whose terms changed
+REFRESH_SQL = [
+    """
+    DELETE FROM detections_fts WHERE rowid IN (
+        SELECT id FROM detections WHERE name IN :names UNION SELECT id FROM detections WHERE zone IN :zones
+    )
+    """,
+    """
+    INSERT INTO detections_fts (rowid, name_terms, zone_terms)
+    SELECT d.id,
+           COALESCE(ct.terms, d.name),
+           COALESCE(zt.terms, d.zone)
+    FROM detections d
+    LEFT JOIN class_terms ct ON ct.name = d.name
+    LEFT JOIN zone_terms zt ON zt.zone = d.zone
+    WHERE d.name IN :names OR d.zone IN :zones
+    """,
+]
+
+
+def tokenize(value, cjk_unigrams=False):
+    """Split text into FTS tokens: Latin words and CJK bigrams."""
+    tokens = []
+    for run in _TOKEN_RE.findall(value.lower()):
+        if not _CJK_RE.match(run):
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if cjk_unigrams:
+                # Lets single-character aliases such as "猫" match inside a longer query
+                tokens.extend(run)
+    return tokens
+
+
+def _terms(*values):
+    seen = []
+    for value in values:
+        for token in tokenize(value):
+            if token not in seen:
+                seen.append(token)
+    return " ".join(seen)
+
+
+def init_fts():
+    """Create the FTS5 index, its term tables and triggers."""
+    with engine.begin() as conn:
+        existed = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'detections_fts'"
+        )).first()
+        for statement in FTS_SCHEMA:
+            conn.execute(text(statement))
+        if not existed:
+            for statement in REBUILD_SQL:
+                conn.execute(text(statement))
+
+
+def _changed(current, wanted):
+    return [key for key in current.keys() | wanted.keys() if current.get(key) != wanted.get(key)]
+
+
+def sync_search_terms(db: Session, aliases_map, zone_descriptions):
+    """
+    Writer op: refresh class/zone term tables from aliases.json and the zone
+    map. Only detections of classes or zones whose terms changed are
+    re-indexed, so editing one alias doesn't rewrite the whole history.
+    """
+    class_terms = {name: _terms(name, *alias_list) for name, alias_list in aliases_map.items()}
+    zone_terms = {zone: _terms(zone) for zone in zone_descriptions}
+
+    current_classes = dict(db.execute(text("SELECT name, terms FROM class_terms")).all())
+    current_zones = dict(db.execute(text("SELECT zone, terms FROM zone_terms")).all())
+    names = _changed(current_classes, class_terms)
+    zones = _changed(current_zones, zone_terms)
+    if not names and not zones:
+        return False
+
+    if names:
+        db.execute(text("DELETE FROM class_terms WHERE name IN :names").bindparams(
+            bindparam("names", expanding=True)), {"names": names})
+        rows = [{"name": name, "terms": class_terms[name]} for name in names if name in class_terms]
+        if rows:
+            db.execute(text("INSERT INTO class_terms (name, terms) VALUES (:name, :terms)"), rows)
+    if zones:
+        db.execute(text("DELETE FROM zone_terms WHERE zone IN :zones").bindparams(
+            bindparam("zones", expanding=True)), {"zones": zones})
+        rows = [{"zone": zone, "terms": zone_terms[zone]} for zone in zones if zone in zone_terms]
+        if rows:
+            db.execute(text("INSERT INTO zone_terms (zone, terms) VALUES (:zone, :terms)"), rows)
+    for statement in REFRESH_SQL:
+        db.execute(text(statement).bindparams(bindparam("names", expanding=True),
+                                              bindparam("zones", expanding=True)),
+                   {"names": names, "zones": zones})
+
+    print(f"Search index updated: {len(names)} classes, {len(zones)} zones changed")
+    return True
+
+
+class SearchVocabulary:
+    """Which tokens name an object and which name a place."""
+
+    def __init__(self, db: Session):
+        self.names = set()
+        self.zones = set()
+        for (terms,) in db.execute(text("SELECT terms FROM class_terms")):
+            self.names.update(terms.split())
+        for (terms,) in db.execute(text("SELECT terms FROM zone_terms")):
+            self.zones.update(terms.split())
+
+    def split(self, q):
+        tokens = tokenize(q, cjk_unigrams=True)
+        names = [t for t in dict.fromkeys(tokens) if t in self.names]
+        # A word that is also a name or alias ("沙发" in "沙发区", "电视" in
+        # "电视柜") means the object, not the place
+        zones = [t for t in dict.fromkeys(tokens) if t in self.zones and t not in self.names]
+        return names, zones
+
+
+_vocabulary = None
+
+def get_vocabulary(db: Session):
+    """Cached SearchVocabulary; dropped whenever the term tables change."""
+    global _vocabulary
+    if _vocabulary is None:
+        _vocabulary = SearchVocabulary(db)
+    return _vocabulary
+
+
+def reset_vocabulary():
+    """Drop the cached vocabulary; call once changed term tables are committed."""
+    global _vocabulary
+    _vocabulary = None
+
+
+def mentions_zone(db: Session, q):
+    """True if the query names a place, e.g. "茶几上的杯子"."""
+    return bool(get_vocabulary(db).split(q)[1])
+
+
+def _match_expression(names, zones):
+    def any_of(column, tokens):
+        quoted = " OR ".join('"' + t.replace('"', '""') + '"' for t in tokens)
+        return f"{column} : ({quoted})"
+
+    parts = []
+    if names:
+        parts.append(any_of("name_terms", names))
+    if zones:
+        parts.append(any_of("zone_terms", zones))
+    return " AND ".join(parts)
+
+
+def ranked_search(db: Session, q, aliases, limit=DEFAULT_PAGE_SIZE, camera=None, min_confidence=0.0):
+    """
+    Full-text search over class names, aliases and zone descriptions,
+    e.g. "茶几上的杯子" -> cups on the coffee table. Results are ranked by
+    BM25 (object words weigh more than place words), then by recency.
+    With `camera`, only that camera's sightings. Not paginated: one page
+    of the best matches.
+    """
+    names, zones = get_vocabulary(db).split(q)
+    if not names and not zones:
+        return {"message": f"未找到物品: {q}", "items": [], "next_before": None}
+
+    rows = db.execute(text(
+        "SELECT d.name, d.zone, d.camera_id, d.confidence, d.timestamp, c.image_url "
+        "FROM detections_fts f "
+        "JOIN detections d ON d.id = f.rowid "
+        "JOIN captures c ON c.id = d.capture_id "
+        "WHERE detections_fts MATCH :match "
+        "AND (:camera IS NULL OR d.camera_id = :camera) "
+        "AND d.confidence >= :min_confidence "
+        "ORDER BY bm25(detections_fts, 10.0, 1.0), d.timestamp DESC "
+        "LIMIT :limit"
+    ).columns(timestamp=DateTime), {
+        "match": _match_expression(names, zones),
+        "camera": camera or None,
+        "min_confidence": min_confidence,
+        "limit": max(1, min(limit, MAX_PAGE_SIZE)),
+    }).all()
+
+    if not rows:
+        return {"message": f"未找到物品: {q}", "items": [], "next_before": None}
+
+    return {"items": [
+        {
+            "name": aliases.display_name(name),
+            "location": zone,
+            "camera": camera_id,
+            "confidence": confidence,
+            "time": timestamp.isoformat(),
+            "image_url": image_url
+        }
+        for name, zone, camera_id, confidence, timestamp, image_url in rows
+    ], "next_before": None}
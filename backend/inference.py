@@ -0,0 +1,108 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import time_stage, INFERENCE_BATCH_SIZE
+
+# Scheduler tuning (overridable from the environment)
+MAX_BATCH_SIZE = int(os.environ.get("FINDIT_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.environ.get("FINDIT_MAX_WAIT_MS", "10"))
+MAX_QUEUE = int(os.environ.get("FINDIT_MAX_QUEUE", "64"))
+
+
+class SchedulerOverloaded(RuntimeError):
+    pass
+
+
+class InferenceScheduler:
+    """
+    Owns the YOLO model and serves every caller from a single worker thread.
+    Requests are queued, grouped into batches of up to `max_batch_size` images
+    within `max_wait_ms`, and answered through per-request futures.
+    """
+
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, max_queue=MAX_QUEUE):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        # Bounded queue: when it is full, submit() blocks (back-pressure)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, source, timeout=None):
+        """Queue one image (path or BGR array) and return a Future for its result."""
+        if self._stopped.is_set():
+            raise RuntimeError("Inference scheduler is stopped")
+
+        future = Future()
+        try:
+            self._queue.put((source, future), timeout=timeout)
+        except queue.Full:
+            raise SchedulerOverloaded("Inference queue is full")
+        return future
+
+    def infer(self, source, timeout=None):
+        """Blocking helper: submit and wait for the result."""
+        return self.submit(source, timeout=timeout).result(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        # Window closed, but still take whatever is already waiting
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._run_batch(batch)
+
+        # Fail anything still queued so callers don't hang forever
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Inference scheduler is stopped"))
+
+    def _run_batch(self, batch):
+        # Skip requests whose callers already gave up
+        live = [(source, future) for source, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+
+        INFERENCE_BATCH_SIZE.observe(len(live))
+        try:
+            with time_stage("inference"):
+                results = self.model([source for source, _ in live])
+        except Exception as e:
+            print(f"Batch inference error ({len(live)} images): {e}")
+            for _, future in live:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(live, results):
+            future.set_result(result)
@@ -0,0 +1,112 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Workers per lane (one lane per camera, plus one for unidentified uploads)
+INGEST_WORKERS = int(os.environ.get("FINDIT_INGEST_WORKERS", "2"))
+# How many finished jobs to remember for /jobs lookups
+MAX_FINISHED_JOBS = int(os.environ.get("FINDIT_MAX_FINISHED_JOBS", "1000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    def __init__(self, job_id, filename):
+        self.id = job_id
+        self.filename = filename
+        self.status = QUEUED
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "filename": self.filename,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs ingestion work (inference + DB writes) on a worker pool so /upload
+    can return as soon as the image is on disk. Job state lives in memory;
+    the oldest finished jobs are forgotten past `max_finished`.
+
+    Jobs run in lanes (one per camera), each with its own workers, so a
+    camera that floods uploads only queues behind itself. All lanes still
+    share the single inference scheduler.
+    """
+
+    def __init__(self, handler, workers=INGEST_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.handler = handler
+        self.workers = workers
+        self.max_finished = max_finished
+        self._executors = {}
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _executor(self, lane):
+        # Called with self._lock held
+        executor = self._executors.get(lane)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"ingest-{lane or 'default'}")
+            self._executors[lane] = executor
+        return executor
+
+    def submit(self, filename, *args, lane=None, **kwargs):
+        job = Job(uuid.uuid4().hex, filename)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            executor = self._executor(lane)
+        executor.submit(self._run, job, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executors = list(self._executors.values())
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+    def _run(self, job, args, kwargs):
+        job.status = RUNNING
+        job.started_at = datetime.now()
+        try:
+            job.result = self.handler(*args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            print(f"Ingest job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = datetime.now()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
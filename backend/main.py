@@ -1,69 +1,180 @@
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, Header, Request
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import datetime
-import shutil
+from datetime import datetime, timedelta
+from typing import Optional
 import os
-import uuid
-import json
 import requests
 import cv2
 import numpy as np
 
-from database import init_db, get_db, Item
+from database import (init_db, get_read_db, db_writer, save_capture, extend_capture, Capture, Detection,
+                      capture_image_url, ReadSessionLocal)
+from search import query_sightings, query_last_seen, query_recent, DEFAULT_PAGE_SIZE
+from aliases import AliasIndex
+from storage import ImageStore, StorageCompactor, IMAGES_DIR
+from dedup import DedupIndex, LastCapture, fingerprint, to_signed
+from fulltext import init_fts, sync_search_terms, reset_vocabulary, ranked_search, mentions_zone
 from ai_engine import AIEngine
+from cameras import CameraRegistry, CaptureScheduler
+from jobs import JobManager, FAILED
+from render import AnnotationCache, thumbnail_width, image_width, THUMBNAIL_CACHE_DIR, THUMBNAIL_CACHE_MB
+from streaming import StreamHub, multipart_chunk, MULTIPART_BOUNDARY
+from mjpeg import MJPEGParser, iter_frames
+from metrics import REGISTRY, UPLOADS, UPLOAD_RESULTS, gauge, counter_func
 
 app = FastAPI(title="FindIt API")
 
-# Ensure images directory exists
-IMAGES_DIR = "images"
-os.makedirs(IMAGES_DIR, exist_ok=True)
+# Content-addressed image files, sharded by hash; the compactor applies
+# retention and keeps files and capture rows in sync
+image_store = ImageStore(IMAGES_DIR)
+storage_compactor = StorageCompactor(image_store)
 
-# Initialize AI Engine
+# Annotated images and thumbnails are rendered lazily into size-bounded caches
+annotation_cache = AnnotationCache()
+thumbnail_cache = AnnotationCache(THUMBNAIL_CACHE_DIR, THUMBNAIL_CACHE_MB * 1024 * 1024)
+
+# Content-addressed files never change, so browsers and proxies may keep them
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Annotations depend on the stored detections as well as the image
+ANNOTATED_CACHE_CONTROL = "public, max-age=86400"
+
+# Initialize AI Engine (the model itself is loaded at startup, in the background)
 ai_engine = AIEngine()
 
+# Registered cameras (cameras.json), each with its own zone map
+camera_registry = CameraRegistry(ai_engine.zone_map)
+
+# One upstream connection per camera URL, shared by all viewers
+stream_hub = StreamHub(ai_engine)
+
 # Load Aliases
 # Use absolute path relative to this file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ALIASES_FILE = os.path.join(BASE_DIR, "aliases.json")
 
-aliases_map = {}
-if os.path.exists(ALIASES_FILE):
-    try:
-        with open(ALIASES_FILE, "r", encoding="utf-8") as f:
-            aliases_map = json.load(f)
-    except Exception as e:
-        print(f"Error loading aliases: {e}")
+# Precompiled alias index; reloads itself when aliases.json changes
+alias_index = AliasIndex(ALIASES_FILE)
 
 @app.get("/status/model")
 def get_model_status():
     """
-    Check if AI model is loaded and working
+    Check if AI model is loaded and working. Answered from the health the
+    engine records on real inferences, so polling never queues model work.
     """
-    if not ai_engine.model:
-        return {"status": "error", "message": "Model not loaded"}
-    
-    # Try a dummy inference on a black image
-    try:
-        dummy_frame = np.zeros((100, 100, 3), dtype=np.uint8)
-        ai_engine.process_frame(dummy_frame)
-        return {"status": "ok", "message": "Model operational", "model_type": "YOLOv8-World"}
-    except Exception as e:
-        return {"status": "error", "message": f"Inference failed: {str(e)}"}
+    return ai_engine.health()
+
+def sync_search_index(aliases_map):
+    # Keep the FTS term tables in line with aliases.json and every camera's zones
+    zone_descriptions = camera_registry.all_descriptions()
+    future = db_writer.submit(lambda db: sync_search_terms(db, aliases_map, zone_descriptions))
+    # Only after the commit, or a query in between would cache the old terms
+    future.add_done_callback(lambda f: reset_vocabulary() if not f.exception() and f.result() else None)
 
 @app.on_event("startup")
 def on_startup():
+    # The model loads in the background; queries are served meanwhile
+    ai_engine.start()
     init_db()
+    init_fts()
+    sync_search_index(alias_index.aliases_map)
+    alias_index.on_reload = sync_search_index
+    storage_compactor.start()
+    capture_scheduler.start()
+
+def image_response(request, path, etag=None, cache_control=None):
+    """FileResponse with validators; answers If-None-Match with 304."""
+    if etag is None:
+        return FileResponse(path, media_type="image/jpeg")
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+def content_etag(filename, variant):
+    # The key already is a content hash, so it makes a strong validator
+    return f'"{os.path.splitext(filename)[0]}-{variant}"'
+
+@app.get("/images/{filename}")
+def get_image(filename: str, request: Request, w: Optional[int] = None):
+    """
+    Stored capture by key (or legacy file name). `w` asks for a thumbnail;
+    it is rounded up to one of the fixed sizes.
+    """
+    filename = os.path.basename(filename)
+    path = image_store.resolve(filename)
+    if not path:
+        raise HTTPException(status_code=404, detail="Image not found")
+    immutable = image_store.is_sharded(path)
+
+    width = None
+    if w:
+        full_width = image_width(path)
+        width = thumbnail_width(w, full_width)
+        if width:
+            path = thumbnail_cache.render(f"w{width}_{filename}", path, [], width, full_width)
+            if not path:
+                raise HTTPException(status_code=500, detail="Rendering failed")
+
+    if not immutable:
+        return image_response(request, path)
+    return image_response(request, path, content_etag(filename, f"w{width}" if width else "full"),
+                          IMMUTABLE_CACHE_CONTROL)
+
+@app.get("/annotated/{filename}")
+def get_annotated_image(filename: str, request: Request, w: Optional[int] = None,
+                        db: Session = Depends(get_read_db)):
+    """
+    Annotated version of a stored capture, rendered from its stored
+    detections on first request and then served from an LRU disk cache.
+    `w` scales it down like on /images.
+    """
+    filename = os.path.basename(filename)
+    width = thumbnail_width(w)
+    key = f"w{width}_{filename}" if width else filename
+    etag = content_etag(filename, f"a{width}" if width else "a")
+
+    cached = annotation_cache.get(key)
+    if cached:
+        return image_response(request, cached, etag, ANNOTATED_CACHE_CONTROL)
 
-app.mount("/images", StaticFiles(directory=IMAGES_DIR), name="images")
+    image_path = image_store.resolve(filename)
+    if not image_path:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    capture = db.query(Capture).filter(Capture.image_path == image_path).first()
+    detections = []
+    if capture:
+        detections = [
+            {"name": det.name, "confidence": det.confidence or 0.0, "bbox": det.pixel_bbox()}
+            for det in capture.detections if det.x1 is not None
+        ]
+    full_width = capture.width if capture and capture.width else image_width(image_path)
+    if width and full_width and width >= full_width:
+        # Smaller than the thumbnail size: serve the full-size rendering
+        width, key, etag = None, filename, content_etag(filename, "a")
+    path = annotation_cache.render(key, image_path, detections, width, full_width)
+    if not path:
+        raise HTTPException(status_code=500, detail="Rendering failed")
+    return image_response(request, path, etag, ANNOTATED_CACHE_CONTROL)
 
 @app.get("/proxy_stream")
-def proxy_stream(url: str, ai: bool = True):
+def proxy_stream(url: str, ai: bool = True, latest: bool = True):
     """
     Real-time AI Stream Proxy.
     Reads MJPEG from ESP32, runs YOLO, and streams back annotated frames.
+    With latest=true (default) reading and inference run in separate stages
+    and stale frames are dropped, so latency stays bounded. Viewers of the
+    same URL share one upstream connection and one annotated stream.
     """
+    if latest:
+        # Registered camera URLs get that camera's zones
+        camera = camera_registry.by_stream_url(url)
+        return StreamingResponse(stream_hub.stream(url, ai=ai, camera=camera),
+                                 media_type=f"multipart/x-mixed-replace; boundary={MULTIPART_BOUNDARY}")
+
     def iterfile():
         try:
             # Use requests to get the stream with a timeout to prevent blocking
@@ -73,155 +184,306 @@ def proxy_stream(url: str, ai: bool = True):
                     # Yield a placeholder or error frame?
                     return
 
-                bytes_data = b''
-                for chunk in r.iter_content(chunk_size=4096):
-                    bytes_data += chunk
-                    a = bytes_data.find(b'\xff\xd8') # JPEG Start
-                    b = bytes_data.find(b'\xff\xd9') # JPEG End
-                    
-                    if a != -1 and b != -1:
-                        jpg = bytes_data[a:b+2]
-                        bytes_data = bytes_data[b+2:]
-                        
-                        if ai:
-                            # Decode to opencv image
-                            img = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
-                            if img is not None:
-                                # AI Process
-                                img = ai_engine.process_frame(img)
-                                # Re-encode
-                                ret, buffer = cv2.imencode('.jpg', img)
-                                if ret:
-                                    frame_bytes = buffer.tobytes()
-                                    yield (b'--frame\r\n'
-                                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                        else:
-                            # Just yield original bytes if no AI
-                            yield (b'--frame\r\n'
-                                   b'Content-Type: image/jpeg\r\n\r\n' + jpg + b'\r\n')
+                boundary = MJPEGParser.boundary_from_content_type(r.headers.get("Content-Type"))
+                for jpg in iter_frames(r.iter_content(chunk_size=16384), boundary=boundary):
+                    if ai:
+                        # Decode to opencv image
+                        img = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                        if img is not None:
+                            # AI Process
+                            img = ai_engine.process_frame(img)
+                            # Re-encode
+                            ret, buffer = cv2.imencode('.jpg', img)
+                            if ret:
+                                yield multipart_chunk(buffer.tobytes())
+                    else:
+                        # Just yield original bytes if no AI
+                        yield multipart_chunk(jpg)
                                    
         except Exception as e:
             print(f"Stream error: {e}")
             # Optional: yield an error image here so frontend sees something
 
 
-    return StreamingResponse(iterfile(), media_type="multipart/x-mixed-replace; boundary=frame")
+    return StreamingResponse(iterfile(), media_type=f"multipart/x-mixed-replace; boundary={MULTIPART_BOUNDARY}")
+
+@app.get("/streams")
+def list_streams():
+    """
+    Active shared camera streams with viewer counts and frame statistics
+    """
+    return {"streams": stream_hub.stats()}
+
+# Last stored capture per camera, for skipping unchanged frames
+dedup_index = DedupIndex(ReadSessionLocal)
+
+def reuse_capture(file_path, filename, last):
+    """
+    Duplicate upload: keep the previous capture and its detections and only
+    extend its "seen at" time. The new file, now referenced by no capture,
+    is removed by the storage compactor.
+    """
+    if not db_writer.write(lambda db: extend_capture(db, last.capture_id, datetime.now())):
+        return None
+    return {
+        "status": "success",
+        "filename": filename,
+        "duplicate_of": last.filename,
+        "detected": last.detected,
+        "annotated_url": f"/annotated/{last.filename}"
+    }
+
+def process_upload(file_path, filename, source=None, camera_id=None):
+    """
+    Ingest worker: run AI inference on a stored upload and save detections.
+    Frames that look the same as the source's last capture skip inference.
+    Locations come from the camera's zone map.
+    """
+    # 0. Byte-identical upload (same content-addressed file) or a recent
+    # capture from this camera showing the same scene: skip inference
+    last = dedup_index.exact(file_path)
+    if last:
+        result = reuse_capture(file_path, filename, last)
+        if result:
+            UPLOAD_RESULTS.inc(outcome="duplicate")
+            return result
+
+    phash = thumb = None
+    if dedup_index.enabled:
+        try:
+            phash, thumb = fingerprint(file_path)
+        except Exception as e:
+            print(f"Hashing failed for {filename}: {e}")
+    if phash is not None:
+        last = dedup_index.match(source, phash, thumb)
+        if last:
+            result = reuse_capture(file_path, filename, last)
+            if result:
+                UPLOAD_RESULTS.inc(outcome="duplicate")
+                return result
+
+    # 1. Run AI Inference; on failure the job fails and nothing is stored,
+    # so later frames are not deduplicated against an empty capture
+    try:
+        detected_objects, (width, height) = ai_engine.analyze_image(file_path, camera_registry.zone_map(camera_id))
+    except Exception:
+        UPLOAD_RESULTS.inc(outcome="failed")
+        raise
+
+    # 2. Build the rows
+    now = datetime.now()
+    capture = Capture(
+        image_path=file_path,
+        width=width,
+        height=height,
+        image_url=capture_image_url(file_path, has_boxes=bool(detected_objects)),
+        timestamp=now,
+        source=source,
+        camera_id=camera_id,
+        phash=to_signed(phash) if phash is not None else None,
+        last_seen_at=now
+    )
 
-@app.post("/upload")
-def upload_image(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    # 1. Save the file
-    file_ext = file.filename.split(".")[-1]
-    filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.{file_ext}"
-    file_path = os.path.join(IMAGES_DIR, filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # 2. Run AI Inference
-    detected_objects, annotated_path = ai_engine.analyze_image(file_path)
-    
-    # 3. Save to DB
     saved_items = []
-    if detected_objects:
-        for obj in detected_objects:
-            # We save the ANNOTATED image path to DB so user sees the boxes by default?
-            # Or we save raw path but return annotated?
-            # Let's save the raw path to DB (clean history), but return annotated for immediate view.
-            # Actually, user wants to see "where is it" in history too. 
-            # Let's update the DB to store annotated path? Or just logic to find it?
-            # Simple approach: Save the annotated image path in DB.
-            
-            # Wait, if we save annotated path, we lose the clean image. 
-            # Better: Save raw path. In query response, check if annotated exists.
-            
-            item = Item(
-                name=obj["name"],
-                location=obj["location_desc"], # Now using logical zones
-                image_path=file_path,
-                timestamp=datetime.now()
-            )
-            db.add(item)
-            saved_items.append(obj)
-    else:
-        # If nothing detected, maybe save a generic "snapshot" record? 
-        # For now, we only save detected items as per requirements.
-        pass
-        
-    db.commit()
-    
+    for obj in detected_objects:
+        # Boxes are stored normalized; annotated images are rendered
+        # from them on demand (/annotated).
+        x1, y1, x2, y2 = obj["bbox"]
+        capture.detections.append(Detection(
+            name=obj["name"],
+            confidence=obj["confidence"],
+            x1=x1 / width, y1=y1 / height, x2=x2 / width, y2=y2 / height,
+            zone=obj["location_desc"], # Now using logical zones
+            timestamp=now,
+            camera_id=camera_id
+        ))
+        saved_items.append(obj)
+
+    # 3. Save to DB through the single writer (batched with other uploads)
+    capture_id = db_writer.write(lambda db: save_capture(db, capture))
+    if capture_id is None:
+        # The same file was uploaded again while this one was being analyzed
+        last = dedup_index.exact(file_path)
+        result = reuse_capture(file_path, filename, last) if last else None
+        if result is None:
+            raise RuntimeError(f"Capture of {filename} already exists but could not be reused")
+        UPLOAD_RESULTS.inc(outcome="duplicate")
+        return result
+    if phash is not None:
+        dedup_index.remember(source, LastCapture(capture_id, phash, filename, now, saved_items, thumb,
+                                                 file_path))
+    UPLOAD_RESULTS.inc(outcome="processed")
+
     return {
-        "status": "success", 
-        "filename": filename, 
+        "status": "success",
+        "filename": filename,
         "detected": saved_items,
-        "annotated_url": f"/images/{os.path.basename(annotated_path)}"
+        "annotated_url": f"/annotated/{filename}"
+    }
+
+# Background ingestion: /upload only persists the bytes and queues a job
+ingest_jobs = JobManager(process_upload)
+
+def ingest(filename, file_path, source, camera_id):
+    # Registered cameras get their own ingest lane; everything else shares one
+    lane = camera_id if camera_registry.get(camera_id) else None
+    return ingest_jobs.submit(filename, file_path, filename, source, camera_id, lane=lane)
+
+def ingest_capture(camera, jpg):
+    # Stills the backend pulled itself on the camera's capture_interval
+    UPLOADS.inc()
+    filename = image_store.save_bytes(jpg, ".jpg")
+    ingest(filename, image_store.path(filename), camera.id, camera.id)
+
+capture_scheduler = CaptureScheduler(camera_registry, ingest_capture)
+
+@app.post("/upload")
+def upload_image(request: Request, file: UploadFile = File(...), camera_id: Optional[str] = Form(None),
+                 x_camera_id: Optional[str] = Header(None)):
+    """
+    Persist the uploaded image and queue it for analysis.
+    Returns immediately with a job id; poll /jobs/{job_id} for progress.
+    Cameras identify themselves with a camera_id form field or the
+    X-Camera-Id header (see cameras.json); detections are tagged with it.
+    """
+    UPLOADS.inc()
+    file_ext = os.path.splitext(file.filename or "")[1]
+    filename = image_store.save(file.file, file_ext)
+    file_path = image_store.path(filename)
+
+    camera_id = camera_id or x_camera_id
+    source = camera_id or (request.client.host if request.client else None)
+    job = ingest(filename, file_path, source, camera_id)
+
+    return {
+        "status": "accepted",
+        "job_id": job.id,
+        "filename": filename,
+        "camera": camera_id,
+        "status_url": f"/jobs/{job.id}",
+        "result_url": f"/jobs/{job.id}/result"
     }
 
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Status of an ingestion job
+    """
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Result of a finished ingestion job (202 while it is still pending)
+    """
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {job.error}")
+    if not job.finished:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    return job.result
+
+# Scrape-time metrics: queue depths and per-stream frame counters are read
+# from their owners when /metrics is requested
+gauge("findit_model_ready", "1 once the model is loaded and warmed up.",
+      lambda: int(ai_engine.ready.is_set() and ai_engine.model is not None))
+gauge("findit_inference_queue_depth", "Images waiting for the inference scheduler.",
+      lambda: ai_engine.scheduler.queue_depth() if ai_engine.scheduler else 0)
+gauge("findit_db_writer_queue_depth", "Operations waiting for the database writer.", db_writer.queue_depth)
+gauge("findit_ingest_jobs_pending", "Uploads queued or being analyzed.", ingest_jobs.pending)
+counter_func("findit_inferences_total", "Model inferences since startup.", lambda: ai_engine.inference_count)
+
+def stream_counter(field):
+    return lambda: [({"url": s["url"]}, s[field]) for s in stream_hub.stats()]
+
+gauge("findit_stream_viewers", "Viewers per camera stream.", stream_counter("viewers"), ("url",))
+for field, help_text in (("frames_read", "Frames read from the camera."),
+                         ("frames_dropped", "Frames dropped because the pipeline fell behind."),
+                         ("frames_inferred", "Frames sent to the model."),
+                         ("frames_reused", "Frames drawn with the previous detections (no motion).")):
+    counter_func(f"findit_stream_{field}_total", help_text, stream_counter(field), ("url",))
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus text exposition of stage latencies, queue depths and counters
+    """
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/query")
-async def query_item(q: str, db: Session = Depends(get_db)):
-    q_lower = q.lower().strip()
-    
-    # Check if query matches any alias value
-    # Format: {"english_name": ["alias1", "alias2"]}
-    target_names = [q_lower] # Default: search for input literally
-    
-    found_alias = False
-    for eng_name, alias_list in aliases_map.items():
-        if q_lower == eng_name or q_lower in alias_list:
-            if not found_alias:
-                target_names = [] # Clear default if we find a match
-                found_alias = True
-            target_names.append(eng_name)
-            
-    # If no alias found, maybe user entered part of an alias?
-    if not found_alias:
-        for eng_name, alias_list in aliases_map.items():
-            for alias in alias_list:
-                if q_lower in alias: # Partial match: "我的钱包" -> matches "钱包" -> "wallet"
-                    if not found_alias:
-                        target_names = []
-                        found_alias = True
-                    if eng_name not in target_names:
-                        target_names.append(eng_name)
-
-    # Perform Query
-    # We construct a query that looks for ANY of the target names
-    # AND also keep the original behavior of partial match on the stored name (which is English)
-    
-    # SQLAlchemy IN clause
-    items = db.query(Item).filter(Item.name.in_(target_names)).order_by(Item.timestamp.desc()).all()
-    
-    # Fallback: if exact alias match failed, try like search on original input (in case it was English)
-    if not items and not found_alias:
-         items = db.query(Item).filter(Item.name.contains(q_lower)).order_by(Item.timestamp.desc()).all()
-    
-    if not items:
-        return {"message": f"未找到物品: {q}", "items": []}
-    
-    results = []
-    for item in items:
-        # Try to find Chinese name for display if available
-        display_name = item.name
-        if item.name in aliases_map:
-             display_name = f"{aliases_map[item.name][0]} ({item.name})"
-
-        # Determine image URL
-        # Check if annotated version exists
-        base_name, ext = os.path.splitext(item.image_path)
-        annotated_path = f"{base_name}_annotated{ext}"
-        
-        if os.path.exists(annotated_path):
-            img_url = f"/images/{os.path.basename(annotated_path)}"
-        else:
-            img_url = f"/images/{os.path.basename(item.image_path)}"
-
-        results.append({
-            "name": display_name,
-            "location": item.location,
-            "time": item.timestamp.isoformat(),
-            "image_url": img_url
-        })
-        
-    return {"items": results}
+async def query_item(q: str, min_confidence: float = 0.0, limit: int = DEFAULT_PAGE_SIZE,
+                     before: Optional[str] = None, latest: bool = False, ranked: bool = False,
+                     camera: Optional[str] = None, db: Session = Depends(get_read_db)):
+    """
+    Search sightings by English name or alias, newest first.
+    Paginated: pass the returned `next_before` as `before` for older results.
+    With latest=true, return only where each item was last seen (per zone).
+    With ranked=true, or when the query names a zone ("茶几上的杯子"), use
+    the FTS5 index and rank by relevance (a single page, no `next_before`).
+    With camera=<id>, only that camera's sightings.
+    """
+    if latest:
+        return query_last_seen(db, q, alias_index, min_confidence=min_confidence, camera=camera)
+    if ranked or (before is None and mentions_zone(db, q)):
+        # Full-text search across names, aliases and zone descriptions
+        return ranked_search(db, q, alias_index, limit=limit, camera=camera, min_confidence=min_confidence)
+    try:
+        return query_sightings(db, q, alias_index, min_confidence=min_confidence, limit=limit, before=before,
+                               camera=camera)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'before' cursor")
+
+@app.get("/recent")
+def recent_items(zone: Optional[str] = None, since_minutes: Optional[int] = None,
+                 limit: int = DEFAULT_PAGE_SIZE, camera: Optional[str] = None,
+                 db: Session = Depends(get_read_db)):
+    """
+    Latest sighting of every class, newest first, in a single query.
+    Optionally filtered by camera, zone description and a time window in minutes.
+    """
+    since = datetime.now() - timedelta(minutes=since_minutes) if since_minutes else None
+    return query_recent(db, alias_index, zone=zone, since=since, limit=limit, camera=camera)
+
+def camera_info(camera, db):
+    info = camera.to_dict()
+    last = db.query(func.max(Capture.timestamp)).filter(Capture.camera_id == camera.id).scalar()
+    info["last_capture"] = last.isoformat() if last else None
+    info["streams"] = [s for s in stream_hub.stats() if s["url"] == camera.stream_url]
+    return info
+
+@app.get("/cameras")
+def list_cameras(db: Session = Depends(get_read_db)):
+    """
+    Registered cameras (cameras.json) with their zones, last capture and
+    active streams
+    """
+    return {"cameras": [camera_info(camera, db) for camera in camera_registry]}
+
+@app.get("/cameras/{camera_id}")
+def get_camera(camera_id: str, db: Session = Depends(get_read_db)):
+    camera = camera_registry.get(camera_id)
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return camera_info(camera, db)
+
+@app.get("/cameras/{camera_id}/stream")
+def camera_stream(camera_id: str, ai: bool = True):
+    """
+    Live view of a registered camera, annotated with its own zones
+    (shared with /proxy_stream viewers of the same URL)
+    """
+    camera = camera_registry.get(camera_id)
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    if not camera.stream_url:
+        raise HTTPException(status_code=404, detail="Camera has no stream_url")
+    return StreamingResponse(stream_hub.stream(camera.stream_url, ai=ai, camera=camera),
+                             media_type=f"multipart/x-mixed-replace; boundary={MULTIPART_BOUNDARY}")
 
 @app.get("/")
 def read_root():
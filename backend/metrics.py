@@ -0,0 +1,182 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from JPEG encode (~1 ms) to slow CPU inference
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """(sample name, labels dict, value) triples for the exposition."""
+        return []
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        out = []
+        for key, series in items:
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets + (float("inf"),), series[:len(self.buckets)] + [series[-1]]):
+                out.append((f"{self.name}_bucket", {**labels, "le": _format_value(float(bound))}, count))
+            out.append((f"{self.name}_sum", labels, series[-2]))
+            out.append((f"{self.name}_count", labels, series[-1]))
+        return out
+
+
+class Gauge(Metric):
+    """
+    Gauge read at scrape time. `callback` returns a number, or a list of
+    (labels dict, value) pairs for labelled series.
+    """
+    type = "gauge"
+
+    def __init__(self, name, help_text, callback, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        try:
+            value = self.callback()
+        except Exception as e:
+            print(f"Metric {self.name} failed: {e}")
+            return []
+        if isinstance(value, list):
+            return [(self.name, labels, v) for labels, v in value]
+        return [(self.name, {}, value)]
+
+
+class CounterFunc(Gauge):
+    """Counter whose value is owned by someone else (e.g. per-stream frame counts)."""
+    type = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # Re-registering a name replaces it, so module reloads don't duplicate series
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+
+def gauge(name, help_text, callback, labelnames=()):
+    return REGISTRY.register(Gauge(name, help_text, callback, labelnames))
+
+
+def counter_func(name, help_text, callback, labelnames=()):
+    return REGISTRY.register(CounterFunc(name, help_text, callback, labelnames))
+
+
+# Shared by the pipeline stages: decode, inference, plot, encode, db_commit
+STAGE_SECONDS = histogram("findit_stage_seconds", "Time spent in each processing stage.", ("stage",))
+INFERENCE_BATCH_SIZE = histogram("findit_inference_batch_size", "Images per model call.",
+                                 buckets=(1, 2, 4, 8, 16, 32, 64))
+UPLOADS = counter("findit_uploads_total", "Images received on /upload.")
+UPLOAD_RESULTS = counter("findit_upload_results_total", "Finished uploads by outcome.", ("outcome",))
+
+
+def time_stage(stage):
+    """Context manager timing one stage into findit_stage_seconds."""
+    return STAGE_SECONDS.time(stage=stage)
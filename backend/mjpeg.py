@@ -0,0 +1,153 @@
+SOI = b'\xff\xd8' # JPEG Start
+EOI = b'\xff\xd9' # JPEG End
+
+# Never buffer more than this while waiting for the end of a frame.
+# UXGA JPEGs from the OV2640 are a few hundred KB at most.
+MAX_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+class MJPEGParser:
+    """
+    Incremental MJPEG / multipart/x-mixed-replace parser.
+
+    feed() appends a chunk and yields every complete JPEG now available as a
+    memoryview into the internal buffer. Each byte is scanned once: the scan
+    resumes where the previous call stopped instead of searching from 0.
+
+    When a part carries a Content-Length header the frame is sliced out
+    directly; otherwise the parser falls back to SOI/EOI marker scanning.
+    The buffer is capped at `max_buffer_size`; a frame that never ends is
+    discarded (and counted) rather than growing memory without bound.
+
+    feed() is a generator and must be exhausted before the next call.
+    Yielded memoryviews are only valid until the next feed() call; copy them
+    with bytes() if they need to outlive it.
+    """
+
+    def __init__(self, boundary=None, max_buffer_size=MAX_BUFFER_SIZE):
+        self.boundary = b'--' + boundary.encode() if isinstance(boundary, str) else boundary
+        self.max_buffer_size = max_buffer_size
+        self.frames_parsed = 0
+        self.bytes_discarded = 0
+
+        self._buf = bytearray()
+        self._view = None
+        self._start = -1       # offset of SOI of the frame being collected
+        self._scan = 0         # resume offset for the next marker search
+        self._length = None    # Content-Length of the current part, if known
+
+    @staticmethod
+    def boundary_from_content_type(content_type):
+        """Extract the multipart boundary from a Content-Type header value."""
+        for param in (content_type or '').split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'boundary' and value:
+                return value.strip('"')
+        return None
+
+    def feed(self, chunk):
+        # Release the previous frame views before the buffer is mutated
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+
+        try:
+            self._buf += chunk
+        except BufferError:
+            # A caller still holds a frame view; continue on a fresh buffer
+            self._buf = self._buf + chunk
+        consumed = 0
+        frames = []
+
+        while True:
+            end = self._next_frame()
+            if end is None:
+                break
+            frames.append((self._start, end))
+            consumed = end
+            self._start = -1
+            self._length = None
+            self._scan = end
+
+        if frames:
+            self._view = memoryview(self._buf)
+            for start, end in frames:
+                self.frames_parsed += 1
+                yield self._view[start:end]
+            self._view.release()
+            self._view = None
+
+        if consumed:
+            self._compact(consumed)
+        self._enforce_limit()
+
+    def _next_frame(self):
+        """Advance the scan; return the end offset of the next complete frame or None."""
+        buf = self._buf
+
+        if self._start < 0:
+            # Look for the next part header (Content-Length) and the SOI marker
+            soi = buf.find(SOI, self._scan)
+            if soi < 0:
+                # Keep one byte in case a marker straddles the chunk edge
+                self._scan = max(self._scan, len(buf) - 1)
+                return None
+            self._length = self._content_length(self._scan, soi)
+            self._start = soi
+            self._scan = soi + 2
+
+        if self._length is not None:
+            end = self._start + self._length
+            if len(buf) < end:
+                return None
+            # Trust Content-Length only if it really lands on an EOI marker
+            if buf[end - 2:end] == EOI:
+                return end
+            self._length = None
+
+        eoi = buf.find(EOI, self._scan)
+        if eoi < 0:
+            self._scan = max(self._scan, len(buf) - 1)
+            return None
+        return eoi + 2
+
+    def _content_length(self, begin, soi):
+        """Parse a Content-Length header between `begin` and the SOI marker, if any."""
+        header = bytes(self._buf[begin:soi])
+        if self.boundary and self.boundary not in header:
+            return None
+        for line in header.split(b'\n'):
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                try:
+                    return int(value.strip())
+                except ValueError:
+                    return None
+        return None
+
+    def _compact(self, consumed):
+        try:
+            del self._buf[:consumed]
+        except BufferError:
+            self._buf = self._buf[consumed:]
+        self._scan = max(0, self._scan - consumed)
+        if self._start >= 0:
+            self._start -= consumed
+
+    def _enforce_limit(self):
+        if len(self._buf) <= self.max_buffer_size:
+            return
+        # An end marker never arrived: drop the partial frame and resync
+        self.bytes_discarded += len(self._buf)
+        self._buf = bytearray()
+        self._start = -1
+        self._scan = 0
+        self._length = None
+
+
+def iter_frames(chunks, boundary=None, max_buffer_size=MAX_BUFFER_SIZE):
+    """Yield JPEG frames (as bytes) from an iterable of MJPEG chunks."""
+    parser = MJPEGParser(boundary=boundary, max_buffer_size=max_buffer_size)
+    for chunk in chunks:
+        for frame in parser.feed(chunk):
+            yield bytes(frame)
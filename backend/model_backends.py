@@ -0,0 +1,204 @@
+import os
+import shutil
+
+import numpy as np
+
+from class_embeddings import set_classes_cached, vocabulary_key, EMBEDDING_CACHE_DIR
+
+# Which runtime executes the network. Every backend returns an ultralytics
+# YOLO object, so predict(), NMS, Results and postprocess.py are identical:
+#   torch      ultralytics PyTorch eager (default)
+#   onnx       YOLO-World exported to ONNX with the class set baked in,
+#              run by ONNX Runtime with tuned thread counts
+#   onnx-int8  the ONNX export, statically quantized to int8 with stored
+#              captures as calibration data
+#   openvino   the same export as OpenVINO IR
+# Exports are cached per weights hash and class list. onnx/onnxruntime and
+# openvino are optional; if a backend cannot be built, torch is used.
+BACKEND = os.environ.get("FINDIT_BACKEND", "torch")
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino")
+EXPORT_DIR = os.environ.get("FINDIT_EXPORT_DIR", EMBEDDING_CACHE_DIR)
+EXPORT_IMGSZ = int(os.environ.get("FINDIT_EXPORT_IMGSZ", "640"))
+
+# ONNX Runtime threading: intra-op threads split each operator; one
+# inter-op thread because the scheduler already runs one batch at a time
+ORT_INTRA_OP_THREADS = int(os.environ.get("FINDIT_ORT_THREADS", str(os.cpu_count() or 1)))
+ORT_INTER_OP_THREADS = int(os.environ.get("FINDIT_ORT_INTER_OP_THREADS", "1"))
+
+# int8 calibration: frames taken from the image store
+CALIBRATION_DIR = os.environ.get("FINDIT_CALIBRATION_DIR", os.environ.get("FINDIT_IMAGES_DIR", "images"))
+CALIBRATION_IMAGES = int(os.environ.get("FINDIT_CALIBRATION_IMAGES", "64"))
+
+
+def load_torch(classes):
+    """YOLO-World with `classes`, falling back to standard YOLOv8n."""
+    from ultralytics import YOLO
+
+    # Try to load YOLO-World first for open vocabulary, fallback to standard YOLOv8n
+    try:
+        print("Attempting to load YOLOv8s-Worldv2 model (Open Vocabulary)...")
+        model = YOLO("yolov8s-worldv2.pt")
+
+        # Only call set_classes if the method exists (it should for World models)
+        if hasattr(model, 'set_classes'):
+            cached = set_classes_cached(model, classes)
+            print(f"YOLO-World loaded with custom classes ({'cached' if cached else 'encoded'} embeddings): "
+                  f"{classes}")
+        else:
+            print("Loaded model does not support set_classes, using default classes.")
+        return model
+
+    except Exception as e:
+        print(f"Error loading YOLO-World model: {e}")
+        print("Falling back to standard YOLOv8n...")
+        try:
+            model = YOLO("yolov8n.pt")
+            print("YOLOv8n loaded as fallback.")
+            return model
+        except Exception as e2:
+            print(f"Critical error loading fallback model: {e2}")
+            return None
+
+
+def export(torch_model, fmt, classes, export_dir=EXPORT_DIR):
+    """
+    Export `torch_model` (classes already set, so the text embeddings are
+    baked in as constants) to "onnx" or "openvino"; cached per weights and
+    vocabulary. Returns the exported path.
+    """
+    key = vocabulary_key(torch_model, classes if hasattr(torch_model, "set_classes") else [])
+    suffix = ".onnx" if fmt == "onnx" else "_openvino_model"
+    path = os.path.join(export_dir, f"yolo_{key}{suffix}")
+    if os.path.exists(path):
+        return path
+
+    print(f"Exporting model to {fmt} (one-off)...")
+    # Dynamic batch so the scheduler can still send batches
+    exported = torch_model.export(format=fmt, imgsz=EXPORT_IMGSZ, dynamic=True)
+    os.makedirs(export_dir, exist_ok=True)
+    shutil.move(str(exported), path)
+    return path
+
+
+class CalibrationReader:
+    """Feeds stored captures, letterboxed like predict() does, to the int8 quantizer."""
+
+    def __init__(self, input_name, image_dir=CALIBRATION_DIR, limit=CALIBRATION_IMAGES, imgsz=EXPORT_IMGSZ):
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self.paths = []
+        for dirpath, dirnames, filenames in os.walk(image_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            self.paths += [os.path.join(dirpath, f) for f in filenames
+                           if f.lower().endswith((".jpg", ".jpeg", ".png"))]
+        self.paths = sorted(self.paths)[-limit:]
+        self._iter = iter(self.paths)
+
+    def preprocess(self, path):
+        import cv2
+        from ultralytics.data.augment import LetterBox
+
+        img = cv2.imread(path)
+        if img is None:
+            return None
+        img = LetterBox((self.imgsz, self.imgsz), auto=False)(image=img)
+        img = img[..., ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW
+        return np.ascontiguousarray(img[None], dtype=np.float32) / 255.0
+
+    def get_next(self):
+        for path in self._iter:
+            tensor = self.preprocess(path)
+            if tensor is not None:
+                return {self.input_name: tensor}
+        return None
+
+    def rewind(self):
+        self._iter = iter(self.paths)
+
+
+def quantize_int8(onnx_path):
+    """
+    Static int8 (QDQ) quantization of an exported model. The detection
+    head stays in float: its box regression and class scores lose the most
+    accuracy when quantized, and it is a small share of the compute.
+    """
+    import re
+
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    path = onnx_path.replace(".onnx", "_int8.onnx")
+    if os.path.exists(path):
+        return path
+
+    graph = onnx.load(onnx_path).graph
+    reader = CalibrationReader(graph.input[0].name)
+    if not reader.paths:
+        raise RuntimeError(f"no calibration images in {CALIBRATION_DIR}")
+
+    layers = [int(m.group(1)) for n in graph.node for m in [re.match(r"/model\.(\d+)/", n.name)] if m]
+    head = f"/model.{max(layers)}/" if layers else None
+    exclude = [n.name for n in graph.node if head and n.name.startswith(head)]
+
+    print(f"Quantizing to int8 with {len(reader.paths)} calibration images...")
+    tmp_path = f"{path}.tmp"
+    quantize_static(onnx_path, tmp_path, reader, quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    nodes_to_exclude=exclude)
+    os.replace(tmp_path, path)
+    return path
+
+
+def tune_onnx_session(model, onnx_path, intra_op_threads=ORT_INTRA_OP_THREADS,
+                      inter_op_threads=ORT_INTER_OP_THREADS):
+    """
+    ultralytics opens ONNX models with default session options; rebuild the
+    session with explicit thread counts once the predictor exists.
+    """
+    import onnxruntime as ort
+
+    model.predict(np.zeros((EXPORT_IMGSZ, EXPORT_IMGSZ, 3), dtype=np.uint8), verbose=False)
+    backend = model.predictor.model
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    backend.session = ort.InferenceSession(onnx_path, options, providers=backend.session.get_providers())
+    backend.output_names = [o.name for o in backend.session.get_outputs()]
+    return model
+
+
+def load_model(backend=BACKEND, classes=(), fallback=True):
+    """
+    Model for `backend` (see BACKEND above). If the backend cannot be set
+    up, the torch model is returned, or the error raised with fallback=False.
+    """
+    from ultralytics import YOLO
+
+    classes = list(classes)
+    torch_model = load_torch(classes)
+    if backend == "torch" or torch_model is None:
+        return torch_model
+    if backend not in BACKENDS:
+        if not fallback:
+            raise ValueError(f"unknown backend {backend!r}")
+        print(f"Unknown backend {backend!r}, using torch")
+        return torch_model
+
+    try:
+        if backend == "openvino":
+            return YOLO(export(torch_model, "openvino", classes), task="detect")
+
+        onnx_path = export(torch_model, "onnx", classes)
+        if backend == "onnx-int8":
+            onnx_path = quantize_int8(onnx_path)
+        model = tune_onnx_session(YOLO(onnx_path, task="detect"), onnx_path)
+        print(f"Using {backend} backend ({ORT_INTRA_OP_THREADS} intra-op threads): {onnx_path}")
+        return model
+    except Exception as e:
+        if not fallback:
+            raise
+        print(f"Could not set up the {backend} backend ({e}); using torch")
+        return torch_model
@@ -0,0 +1,65 @@
+import os
+
+import cv2
+import numpy as np
+
+# Fraction of (unmasked) pixels that must change to count as motion;
+# 0 disables gating, so every frame goes through the model
+MOTION_THRESHOLD = float(os.environ.get("FINDIT_MOTION_THRESHOLD", "0.01"))
+# Per-pixel gray level change that counts as "changed" (0-255)
+MOTION_PIXEL_DELTA = int(os.environ.get("FINDIT_MOTION_PIXEL_DELTA", "25"))
+# Seconds between forced inferences on a static scene
+KEYFRAME_INTERVAL = float(os.environ.get("FINDIT_KEYFRAME_INTERVAL", "10"))
+
+MOTION_SIZE = (64, 48)
+
+
+class MotionDetector:
+    """
+    Cheap change detector for one stream: frames are shrunk to 64x48
+    grayscale and compared with the frame the model last saw. Zones marked
+    "motion": false in zones.json (a TV, a window) are masked out.
+    """
+
+    def __init__(self, zone_map=None, threshold=MOTION_THRESHOLD, pixel_delta=MOTION_PIXEL_DELTA,
+                 size=MOTION_SIZE):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.mask = self._build_mask(zone_map)
+        self._active = max(1, int(np.count_nonzero(self.mask)))
+        self._reference = None
+        self._current = None
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def _build_mask(self, zone_map):
+        width, height = self.size
+        mask = np.ones((height, width), dtype=bool)
+        if zone_map is None or all(z.motion for z in zone_map.zones):
+            return mask
+        # Pixel centers in normalized coordinates, looked up like box centers
+        ys, xs = np.mgrid[0:height, 0:width]
+        indices = zone_map.zone_indices((xs.ravel() + 0.5) / width, (ys.ravel() + 0.5) / height)
+        ignored = np.array([not z.motion for z in zone_map.zones] + [False])
+        mask.ravel()[ignored[indices]] = False
+        return mask
+
+    def _shrink(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        small = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def moved(self, img):
+        """True if `img` differs from the last keyframe (always True before the first one)."""
+        self._current = self._shrink(img)
+        if self._reference is None:
+            return True
+        changed = cv2.absdiff(self._current, self._reference) > self.pixel_delta
+        return np.count_nonzero(changed & self.mask) / self._active >= self.threshold
+
+    def keyframe(self):
+        """The frame last passed to moved() went through the model; compare against it from now on."""
+        self._reference = self._current
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+
+# Lowered confidence threshold for open vocabulary
+CONFIDENCE_THRESHOLD = float(os.environ.get("FINDIT_CONF_THRESHOLD", "0.15"))
+# Extra NMS on top of the model's own; 0 disables it
+NMS_IOU_THRESHOLD = float(os.environ.get("FINDIT_NMS_IOU", "0"))
+# Agnostic NMS also merges overlapping boxes of different classes,
+# e.g. "key" / "keys" / "bunch of keys" from the open vocabulary
+NMS_AGNOSTIC = os.environ.get("FINDIT_NMS_AGNOSTIC", "0") == "1"
+
+
+def to_numpy(x):
+    """Tensor (CPU or GPU) or array-like -> numpy array."""
+    if hasattr(x, "cpu"):
+        x = x.cpu()
+    if hasattr(x, "numpy"):
+        x = x.numpy()
+    return np.asarray(x)
+
+
+def nms(xyxy, scores, classes=None, iou_threshold=0.5):
+    """
+    Greedy non-maximum suppression. Returns kept indices, best score first.
+    With `classes`, boxes only suppress boxes of the same class.
+    """
+    if len(xyxy) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    boxes = xyxy.astype(np.float64)
+    if classes is not None:
+        # Shift each class into its own coordinate range so classes never overlap
+        boxes = boxes + (classes.astype(np.float64) * (boxes.max() + 1))[:, None]
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def postprocess(result, names, zone_map, conf_threshold=CONFIDENCE_THRESHOLD,
+                iou_threshold=NMS_IOU_THRESHOLD, agnostic=NMS_AGNOSTIC):
+    """
+    Turn one ultralytics result into detection records.
+
+    cls/conf/xyxy are pulled out as arrays once; thresholding, optional NMS,
+    normalized centers and zone assignment are array operations, so the
+    Python loop only runs over the boxes that survive.
+    """
+    img_height, img_width = result.orig_shape[:2]
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+
+    cls = to_numpy(boxes.cls).astype(np.int64).reshape(-1)
+    conf = to_numpy(boxes.conf).astype(np.float64).reshape(-1)
+    xyxy = to_numpy(boxes.xyxy).astype(np.float64).reshape(-1, 4)
+
+    mask = conf > conf_threshold
+    cls, conf, xyxy = cls[mask], conf[mask], xyxy[mask]
+
+    if iou_threshold > 0 and len(conf):
+        keep = nms(xyxy, conf, None if agnostic else cls, iou_threshold)
+        keep.sort()  # keep the model's original order
+        cls, conf, xyxy = cls[keep], conf[keep], xyxy[keep]
+
+    # Normalized centers for every box at once
+    x_centers = (xyxy[:, 0] + xyxy[:, 2]) / 2 / img_width
+    y_centers = (xyxy[:, 1] + xyxy[:, 3]) / 2 / img_height
+    locations = zone_map.describe_many(x_centers, y_centers)
+
+    return [
+        {
+            "name": names[c],
+            "confidence": score,
+            "location_desc": location,
+            "bbox": box,
+        }
+        for c, score, location, box in zip(cls.tolist(), conf.tolist(), locations, xyxy.tolist())
+    ]
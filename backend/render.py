@@ -0,0 +1,180 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+from PIL import Image
+
+from metrics import time_stage
+
+ANNOTATED_CACHE_DIR = os.environ.get("FINDIT_ANNOTATED_CACHE_DIR", "annotated_cache")
+ANNOTATED_CACHE_MB = int(os.environ.get("FINDIT_ANNOTATED_CACHE_MB", "256"))
+THUMBNAIL_CACHE_DIR = os.environ.get("FINDIT_THUMBNAIL_CACHE_DIR", "thumbnail_cache")
+THUMBNAIL_CACHE_MB = int(os.environ.get("FINDIT_THUMBNAIL_CACHE_MB", "256"))
+
+# ?w= is rounded up to one of these, so each image has a few cached sizes at most
+THUMBNAIL_WIDTHS = tuple(sorted(int(w) for w in os.environ.get("FINDIT_THUMBNAIL_WIDTHS", "160,320,640").split(",")))
+
+# cv2 can decode JPEGs at 1/2, 1/4 or 1/8 scale, which is much cheaper than full size
+_REDUCED_READ_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                       (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def thumbnail_width(requested, full_width=None):
+    """
+    Snap a requested width up to a fixed thumbnail size. None means the
+    original: no width asked for, or none of the sizes is smaller than it.
+    """
+    if not requested or requested <= 0:
+        return None
+    for width in THUMBNAIL_WIDTHS:
+        if width >= requested:
+            break
+    else:
+        return None
+    if full_width and width >= full_width:
+        return None
+    return width
+
+
+def image_width(image_path):
+    """Width from the file header, without decoding the image."""
+    try:
+        with Image.open(image_path) as im:
+            return im.width
+    except Exception:
+        return None
+
+
+def load_image(image_path, width=None, full_width=None):
+    """Read a BGR image, scaled to `width` pixels wide if given."""
+    img = None
+    if width and full_width:
+        for factor, flag in _REDUCED_READ_FLAGS:
+            if full_width // factor >= width:
+                img = cv2.imread(image_path, flag)
+                break
+    if img is None:
+        img = cv2.imread(image_path)
+    if img is None or not width or img.shape[1] <= width:
+        return img
+    height = max(1, round(img.shape[0] * width / img.shape[1]))
+    return cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def class_color(name):
+    """Stable BGR color per class name."""
+    h = sum(ord(c) * 31 ** i for i, c in enumerate(name)) & 0xFFFFFF
+    return (h & 0xFF, (h >> 8) & 0xFF, (h >> 16) & 0xFF)
+
+
+def draw_detections(img, detections):
+    """
+    Draw boxes and labels on a BGR image in place.
+    `detections` are dicts with name, confidence and bbox ([x1, y1, x2, y2] in pixels).
+    """
+    thickness = max(1, round(sum(img.shape[:2]) / 600))
+    font_scale = thickness / 3
+    for det in detections:
+        x1, y1, x2, y2 = (int(round(v)) for v in det["bbox"])
+        color = class_color(det["name"])
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, thickness, cv2.LINE_AA)
+
+        label = f"{det['name']} {det['confidence']:.2f}"
+        (w, h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        top = y1 - h - baseline if y1 - h - baseline >= 0 else y1
+        cv2.rectangle(img, (x1, top), (x1 + w, top + h + baseline), color, -1, cv2.LINE_AA)
+        cv2.putText(img, label, (x1, top + h), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                    (255, 255, 255), thickness, cv2.LINE_AA)
+    return img
+
+
+class AnnotationCache:
+    """
+    Size-bounded LRU disk cache of rendered images (annotated views and
+    thumbnails).
+    Entries are plain JPEG files; least recently served ones are deleted
+    once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=ANNOTATED_CACHE_DIR, max_bytes=ANNOTATED_CACHE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, oldest first
+        self._total = 0
+
+        # Pick up what survived the last run, oldest access first
+        existing = []
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if os.path.isfile(path) and not name.endswith(".tmp"):
+                st = os.stat(path)
+                existing.append((st.st_atime, name, st.st_size))
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+            self._total += size
+        self._evict()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """Return the cached file path for `key` (marking it recently used) or None."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self.path_for(key)
+        return path if os.path.exists(path) else None
+
+    def render(self, key, image_path, detections, width=None, full_width=None):
+        """
+        Render `image_path` with `detections` (pixel boxes of the full-size
+        image) into the cache, optionally scaled to `width`, and return the
+        file path. `full_width` lets JPEGs be decoded at reduced scale.
+        """
+        cached = self.get(key)
+        if cached:
+            return cached
+
+        with time_stage("decode"):
+            img = load_image(image_path, width, full_width)
+        if img is None:
+            return None
+        if detections:
+            scale = img.shape[1] / full_width if width and full_width else 1.0
+            if scale != 1.0:
+                detections = [dict(det, bbox=[v * scale for v in det["bbox"]]) for det in detections]
+            with time_stage("plot"):
+                draw_detections(img, detections)
+
+        with time_stage("encode"):
+            ok, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if not ok:
+            return None
+
+        # Atomic publish so concurrent readers never see a partial file
+        path = self.path_for(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.tobytes())
+        os.replace(tmp_path, path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+        return path
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
@@ -0,0 +1,150 @@
+from datetime import datetime
+
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session
+
+from database import Capture, Detection, LastSeen
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp, detection_id):
+    return f"{timestamp.isoformat()}|{detection_id}"
+
+
+def decode_cursor(cursor):
+    """Parse a `before` cursor; raises ValueError if it is malformed."""
+    timestamp, _, detection_id = cursor.partition("|")
+    return datetime.fromisoformat(timestamp), int(detection_id) if detection_id else None
+
+
+def query_sightings(db: Session, q, aliases, min_confidence=0.0, limit=DEFAULT_PAGE_SIZE, before=None,
+                    camera=None):
+    """
+    Sightings matching `q`, newest first, in the /query response format.
+    Everything comes from the database; no per-row filesystem access.
+    With `camera`, only that camera's sightings.
+
+    Results are paginated with a keyset cursor on (timestamp, id): pass the
+    returned `next_before` as `before` to get the next, older page.
+    """
+    q_lower = q.lower().strip()
+    target_names, found_alias = aliases.resolve(q_lower)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # Only the columns the response needs
+    base_query = db.query(
+        Detection.id, Detection.name, Detection.zone, Detection.confidence, Detection.timestamp,
+        Detection.camera_id, Capture.image_url
+    ).join(Capture, Detection.capture_id == Capture.id)
+    if camera:
+        base_query = base_query.filter(Detection.camera_id == camera)
+    if min_confidence > 0:
+        base_query = base_query.filter(Detection.confidence >= min_confidence)
+    if before:
+        before_time, before_id = decode_cursor(before)
+        if before_id is None:
+            base_query = base_query.filter(Detection.timestamp < before_time)
+        else:
+            base_query = base_query.filter(or_(
+                Detection.timestamp < before_time,
+                and_(Detection.timestamp == before_time, Detection.id < before_id),
+            ))
+
+    def page(query):
+        # One extra row tells us whether there is another page
+        return query.order_by(Detection.timestamp.desc(), Detection.id.desc()).limit(limit + 1).all()
+
+    # SQLAlchemy IN clause
+    rows = page(base_query.filter(Detection.name.in_(target_names)))
+
+    # Fallback: if exact alias match failed, try like search on original input (in case it was English)
+    if not rows and not found_alias:
+         rows = page(base_query.filter(Detection.name.contains(q_lower)))
+
+    if not rows:
+        return {"message": f"未找到物品: {q}", "items": [], "next_before": None}
+
+    next_before = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_before = encode_cursor(rows[-1].timestamp, rows[-1].id)
+
+    results = []
+    for _, name, zone, confidence, timestamp, camera_id, image_url in rows:
+        results.append({
+            # Chinese name for display if available
+            "name": aliases.display_name(name),
+            "location": zone,
+            "camera": camera_id,
+            "confidence": confidence,
+            "time": timestamp.isoformat(),
+            "image_url": image_url
+        })
+
+    return {"items": results, "next_before": next_before}
+
+
+def query_last_seen(db: Session, q, aliases, min_confidence=0.0, camera=None):
+    """
+    Latest sighting of the matching classes, one per zone and camera,
+    newest first. Served from the last_seen table (primary key lookups on
+    class name).
+    """
+    q_lower = q.lower().strip()
+    target_names, found_alias = aliases.resolve(q_lower)
+
+    query = db.query(LastSeen).filter(LastSeen.name.in_(target_names))
+    if camera:
+        query = query.filter(LastSeen.camera_id == camera)
+    if min_confidence > 0:
+        query = query.filter(LastSeen.confidence >= min_confidence)
+    rows = query.order_by(LastSeen.timestamp.desc()).all()
+
+    if not rows:
+        return {"message": f"未找到物品: {q}", "items": []}
+
+    return {"items": [
+        {
+            "name": aliases.display_name(row.name),
+            "location": row.zone,
+            "camera": row.camera_id or None,
+            "confidence": row.confidence,
+            "time": row.timestamp.isoformat(),
+            "image_url": row.image_url
+        }
+        for row in rows
+    ]}
+
+
+def query_recent(db: Session, aliases, zone=None, since=None, limit=DEFAULT_PAGE_SIZE, camera=None):
+    """
+    Latest sighting per class, newest first, from one grouped query over
+    last_seen. Optionally restricted to one camera, one zone and/or to
+    sightings after `since`.
+    """
+    latest = func.max(LastSeen.timestamp)
+    # SQLite returns the bare columns from the row holding MAX(timestamp)
+    query = db.query(LastSeen.name, LastSeen.zone, LastSeen.camera_id, LastSeen.confidence, LastSeen.image_url,
+                     latest)
+    if camera:
+        query = query.filter(LastSeen.camera_id == camera)
+    if zone:
+        query = query.filter(LastSeen.zone == zone)
+    if since:
+        query = query.filter(LastSeen.timestamp >= since)
+    rows = query.group_by(LastSeen.name).order_by(latest.desc()).limit(max(1, min(limit, MAX_PAGE_SIZE))).all()
+
+    return {"items": [
+        {
+            "name": aliases.display_name(name),
+            "class": name,
+            "location": zone_desc,
+            "camera": camera_id or None,
+            "confidence": confidence,
+            "time": timestamp.isoformat(),
+            "image_url": image_url
+        }
+        for name, zone_desc, camera_id, confidence, image_url, timestamp in rows
+    ]}
@@ -0,0 +1,358 @@
+import hashlib
+import io
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from PIL import Image
+from sqlalchemy import func, text
+
+from database import Capture, LastSeen, capture_image_url, db_writer, ReadSessionLocal
+
+IMAGES_DIR = os.environ.get("FINDIT_IMAGES_DIR", "images")
+
+# Retention: captures not seen for this many days are downsampled and
+# recompressed, and after FINDIT_DELETE_AFTER_DAYS deleted (0 = never).
+# Captures still referenced by last_seen are always kept.
+RECOMPRESS_AFTER_DAYS = float(os.environ.get("FINDIT_RECOMPRESS_AFTER_DAYS", "7"))
+DELETE_AFTER_DAYS = float(os.environ.get("FINDIT_DELETE_AFTER_DAYS", "90"))
+ARCHIVE_MAX_WIDTH = int(os.environ.get("FINDIT_ARCHIVE_MAX_WIDTH", "800"))
+ARCHIVE_QUALITY = int(os.environ.get("FINDIT_ARCHIVE_QUALITY", "60"))
+# Seconds between compactor passes (0 disables the background thread)
+COMPACT_INTERVAL = float(os.environ.get("FINDIT_COMPACT_INTERVAL", "3600"))
+# Files without a capture row are only removed once they are this old,
+# so uploads still waiting in the ingest queue are left alone
+ORPHAN_GRACE_SECONDS = float(os.environ.get("FINDIT_ORPHAN_GRACE_SECONDS", "3600"))
+
+COMPACT_BATCH_SIZE = 200
+KEY_LENGTH = 32
+
+
+def _extension(ext):
+    ext = (ext or "").lower().lstrip(".")
+    return f".{ext}" if ext.isalnum() and len(ext) <= 5 else ".jpg"
+
+
+class ImageStore:
+    """
+    Content-addressed image files. A file's key is the first 32 hex digits
+    of its SHA-256 plus the extension, and it lives under two levels of
+    shard directories (images/ab/cd/abcd....jpg), so no directory grows
+    past a few hundred entries. Identical uploads share one file.
+    Files from before sharding stay readable at images/<name>.
+    """
+
+    def __init__(self, root=IMAGES_DIR):
+        self.root = root
+        self.incoming = os.path.join(root, ".incoming")
+        os.makedirs(self.incoming, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def is_sharded(self, path):
+        key = os.path.basename(path)
+        return os.path.normpath(path) == os.path.normpath(self.path(key))
+
+    def resolve(self, filename):
+        """Path of a stored file by key (or legacy flat name), or None."""
+        filename = os.path.basename(filename)
+        if not filename or filename.startswith("."):
+            return None
+        for path in (self.path(filename), os.path.join(self.root, filename)):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def save(self, fileobj, ext=".jpg"):
+        """Stream `fileobj` into the store; returns its key."""
+        digest = hashlib.sha256()
+        tmp_path = os.path.join(self.incoming, uuid.uuid4().hex)
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = fileobj.read(1024 * 1024)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+        return self._commit(tmp_path, digest.hexdigest()[:KEY_LENGTH] + _extension(ext))
+
+    def save_bytes(self, data, ext=".jpg"):
+        return self.save(io.BytesIO(data), ext)
+
+    def key_of(self, src_path):
+        """Key an existing file would get in the store."""
+        digest = hashlib.sha256()
+        with open(src_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()[:KEY_LENGTH] + _extension(os.path.splitext(src_path)[1])
+
+    def add_file(self, src_path, key=None):
+        """
+        Copy an existing file into the store; returns its key. The source
+        is left in place for the caller to delete once nothing refers to it.
+        """
+        key = key or self.key_of(src_path)
+        if not os.path.exists(self.path(key)):
+            tmp_path = os.path.join(self.incoming, uuid.uuid4().hex)
+            shutil.copyfile(src_path, tmp_path)
+            self._commit(tmp_path, key)
+        return key
+
+    def _commit(self, tmp_path, key):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return key
+
+    def delete(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def files(self):
+        """(path, mtime) of every stored file, legacy flat files included."""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    yield path, os.path.getmtime(path)
+                except OSError:
+                    continue
+
+    def incoming_files(self):
+        for entry in os.scandir(self.incoming):
+            if entry.is_file():
+                yield entry.path, entry.stat().st_mtime
+
+
+def _has_boxes(db, capture_id):
+    return bool(db.execute(text(
+        "SELECT 1 FROM detections WHERE capture_id = :id AND x1 IS NOT NULL LIMIT 1"
+    ), {"id": capture_id}).first())
+
+
+def move_capture(db, capture_id, image_path, width=None, height=None, archived=None):
+    """
+    Writer op: point a capture (and its last_seen rows) at a new file.
+    Returns the old path, or None if the capture is gone.
+    """
+    capture = db.get(Capture, capture_id)
+    if capture is None:
+        return None
+    old_path = capture.image_path
+    capture.image_path = image_path
+    capture.annotated = False
+    capture.image_url = capture_image_url(image_path, has_boxes=_has_boxes(db, capture_id))
+    if width and height:
+        capture.width, capture.height = width, height
+    if archived is not None:
+        capture.archived = archived
+    db.query(LastSeen).filter(LastSeen.capture_id == capture_id).update(
+        {LastSeen.image_url: capture.image_url}, synchronize_session=False)
+    return old_path
+
+
+def last_active():
+    # Duplicate uploads keep a capture alive through last_seen_at
+    return func.coalesce(Capture.last_seen_at, Capture.timestamp)
+
+
+def expire_captures(db, cutoff, limit=COMPACT_BATCH_SIZE, ids=None):
+    """
+    Writer op: delete up to `limit` captures last seen before `cutoff` (or
+    the given `ids`) that no last_seen row points at. Detections go with
+    them (FK cascade). Returns the image paths of the deleted captures.
+    """
+    query = db.query(Capture.id, Capture.image_path).filter(
+        ~Capture.id.in_(db.query(LastSeen.capture_id)))
+    if ids is not None:
+        query = query.filter(Capture.id.in_(ids))
+    else:
+        query = query.filter(last_active() < cutoff)
+    rows = query.limit(limit).all()
+    if rows:
+        db.query(Capture).filter(Capture.id.in_([r.id for r in rows])).delete(synchronize_session=False)
+    return [r.image_path for r in rows]
+
+
+def recompress(image_path, max_width=ARCHIVE_MAX_WIDTH, quality=ARCHIVE_QUALITY):
+    """Downsampled, recompressed JPEG bytes and size, or None if that would not save space."""
+    with Image.open(image_path) as im:
+        im.draft("RGB", (max_width, max_width))
+        im = im.convert("RGB")
+        if im.width > max_width:
+            im = im.resize((max_width, round(im.height * max_width / im.width)), Image.LANCZOS)
+        out = io.BytesIO()
+        im.save(out, "JPEG", quality=quality, optimize=True)
+    data = out.getvalue()
+    if len(data) >= os.path.getsize(image_path):
+        return None
+    return data, im.size
+
+
+class StorageCompactor:
+    """
+    Background maintenance of the image store, one pass every `interval`
+    seconds:
+      1. move legacy flat files into the sharded store
+      2. recompress captures not seen for RECOMPRESS_AFTER_DAYS
+      3. delete captures not seen for DELETE_AFTER_DAYS
+      4. reconcile: drop rows whose file is gone and files no row uses
+    All row changes go through the database writer.
+    """
+
+    def __init__(self, store, interval=COMPACT_INTERVAL, session_factory=ReadSessionLocal):
+        self.store = store
+        self.interval = interval
+        self.session_factory = session_factory
+        self.last_run = None
+        self.last_stats = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.interval <= 0:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="storage-compactor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Storage compaction failed: {e}")
+            time.sleep(self.interval)
+
+    def _read(self, fn):
+        db = self.session_factory()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    def run_once(self):
+        with self._lock:
+            stats = {
+                "migrated": self.migrate_legacy(),
+                "recompressed": self.recompress_old(),
+                "expired": self.expire_old(),
+            }
+            stats.update(self.reconcile())
+            self.last_run = datetime.now()
+            self.last_stats = stats
+            if any(stats.values()):
+                print(f"Storage compaction: {stats}")
+            return stats
+
+    def migrate_legacy(self):
+        rows = self._read(lambda db: db.query(Capture.id, Capture.image_path).all())
+        referenced = {os.path.normpath(path) for _, path in rows}
+        migrated = 0
+        for capture_id, image_path in rows:
+            if self.store.is_sharded(image_path) or not os.path.isfile(image_path):
+                continue
+            try:
+                key = self.store.key_of(image_path)
+                new_path = self.store.path(key)
+                if os.path.normpath(new_path) in referenced:
+                    # Same bytes as another capture's file; keep serving the flat copy
+                    continue
+                self.store.add_file(image_path, key)
+                old_path = db_writer.write(lambda db: move_capture(db, capture_id, new_path))
+            except Exception as e:
+                # The flat file stays; an unreferenced store copy is reconciled later
+                print(f"Could not move {image_path} into the image store: {e}")
+                continue
+            if old_path is None:
+                continue
+            referenced.add(os.path.normpath(new_path))
+            # Only now that the capture points at the store copy
+            self.store.delete(image_path)
+            # Annotations are rendered on demand now
+            base_name, ext = os.path.splitext(image_path)
+            self.store.delete(f"{base_name}_annotated{ext}")
+            migrated += 1
+        return migrated
+
+    def recompress_old(self):
+        if RECOMPRESS_AFTER_DAYS <= 0:
+            return 0
+        cutoff = datetime.now() - timedelta(days=RECOMPRESS_AFTER_DAYS)
+        rows = self._read(lambda db: db.query(Capture.id, Capture.image_path)
+                          .filter(Capture.archived.isnot(True))
+                          .filter(last_active() < cutoff)
+                          .all())
+        recompressed = 0
+        for capture_id, image_path in rows:
+            try:
+                smaller = recompress(image_path) if os.path.isfile(image_path) else None
+            except Exception as e:
+                print(f"Recompress failed for {image_path}: {e}")
+                smaller = None
+            if smaller is None:
+                db_writer.write(lambda db: db.query(Capture).filter(Capture.id == capture_id)
+                                .update({Capture.archived: True}, synchronize_session=False))
+                continue
+            data, (width, height) = smaller
+            new_path = self.store.path(self.store.save_bytes(data, ".jpg"))
+            old_path = db_writer.write(
+                lambda db: move_capture(db, capture_id, new_path, width, height, archived=True))
+            if old_path and old_path != new_path:
+                self.store.delete(old_path)
+            recompressed += 1
+        return recompressed
+
+    def expire_old(self):
+        if DELETE_AFTER_DAYS <= 0:
+            return 0
+        cutoff = datetime.now() - timedelta(days=DELETE_AFTER_DAYS)
+        expired = 0
+        while True:
+            paths = db_writer.write(lambda db: expire_captures(db, cutoff))
+            for path in paths:
+                self.store.delete(path)
+            expired += len(paths)
+            if len(paths) < COMPACT_BATCH_SIZE:
+                return expired
+
+    def reconcile(self):
+        # Rows first: a file is always written before its row, so every
+        # row read here has its file on disk unless it really is missing
+        rows = self._read(lambda db: db.query(Capture.id, Capture.image_path).all())
+        referenced = {os.path.normpath(path) for _, path in rows}
+
+        now = time.time()
+        on_disk = set()
+        orphan_files = 0
+        for path, mtime in self.store.files():
+            path = os.path.normpath(path)
+            on_disk.add(path)
+            if path not in referenced and now - mtime > ORPHAN_GRACE_SECONDS:
+                self.store.delete(path)
+                orphan_files += 1
+        for path, mtime in self.store.incoming_files():
+            if now - mtime > ORPHAN_GRACE_SECONDS:
+                self.store.delete(path)
+
+        # Rows whose image is gone; last_seen targets keep their history
+        missing = [cid for cid, path in rows
+                   if os.path.normpath(path) not in on_disk and not os.path.exists(path)]
+        missing_rows = 0
+        for i in range(0, len(missing), COMPACT_BATCH_SIZE):
+            batch = missing[i:i + COMPACT_BATCH_SIZE]
+            missing_rows += len(db_writer.write(lambda db: expire_captures(db, None, ids=batch)))
+        return {"orphan_files": orphan_files, "missing_rows": missing_rows}
@@ -0,0 +1,314 @@
+import asyncio
+import threading
+import time
+
+import cv2
+import numpy as np
+import requests
+
+from mjpeg import MJPEGParser, iter_frames
+from motion import MotionDetector, KEYFRAME_INTERVAL
+from render import draw_detections
+from metrics import time_stage
+
+MULTIPART_BOUNDARY = "frame"
+
+
+def multipart_chunk(jpg):
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + bytes(jpg) + b'\r\n')
+
+
+class LatestFrame:
+    """
+    Single-slot mailbox. put() always overwrites, so a slow consumer only
+    ever sees the newest frame. Every frame gets a sequence number; a
+    consumer can tell how many frames it skipped from the gap in numbers.
+
+    Threads wait with get(); coroutines with get_async(), which parks a
+    future on the event loop instead of a worker thread per viewer.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._waiters = set()  # (loop, future) of get_async() callers
+        self.closed = False
+
+    def put(self, frame):
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify_all()
+            self._wake()
+
+    def _newer(self, last_seq):
+        if self._seq <= last_seq:
+            return last_seq, None
+        return self._seq, self._frame
+
+    def get(self, last_seq=0, timeout=None):
+        """Wait for a frame newer than `last_seq`. Returns (seq, frame) or (last_seq, None)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > last_seq or self.closed, timeout=timeout)
+            return self._newer(last_seq)
+
+    async def get_async(self, last_seq=0, timeout=None):
+        """get() for coroutines."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._seq > last_seq or self.closed:
+                return self._newer(last_seq)
+            waiter = (loop, loop.create_future())
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._waiters.discard(waiter)
+        with self._cond:
+            return self._newer(last_seq)
+
+    def _wake(self):
+        # Called with the lock held, from the reader/inference threads
+        for loop, future in self._waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # loop already closed
+        self._waiters.clear()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            self._wake()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class StreamPipeline:
+    """
+    Decoupled reader -> inference pipeline for one upstream MJPEG stream,
+    shared by every viewer of that stream.
+
+    The reader thread keeps draining the camera and holds only the newest
+    JPEG; the inference thread (running while at least one viewer wants AI)
+    always picks up that newest JPEG, so latency stays bounded when YOLO is
+    slower than the camera. Skipped frames are counted in `frames_dropped`.
+
+    The model only runs when the motion detector sees a change or every
+    `keyframe_interval` seconds; in between, the last detections are drawn
+    onto the new frame (`frames_reused`).
+
+    `zone_map` is the camera's zone map (see cameras.py); zones.json by default.
+    """
+
+    def __init__(self, url, ai_engine, read_timeout=5, keyframe_interval=KEYFRAME_INTERVAL,
+                 zone_map=None, camera_id=None):
+        self.url = url
+        self.ai_engine = ai_engine
+        self.read_timeout = read_timeout
+        self.keyframe_interval = keyframe_interval
+        self.zone_map = zone_map or ai_engine.zone_map
+        self.camera_id = camera_id
+        self.motion = MotionDetector(self.zone_map)
+
+        self.raw = LatestFrame()
+        self.annotated = LatestFrame()
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.frames_inferred = 0
+        self.frames_reused = 0
+
+        self.viewers = 0
+        self.ai_viewers = 0
+        self._lock = threading.Lock()
+        self._infer_thread = None
+        self._stopped = threading.Event()
+        self._reader_thread = threading.Thread(target=self._read_loop, name="stream-reader", daemon=True)
+
+    @property
+    def closed(self):
+        return self._stopped.is_set()
+
+    def start(self):
+        self._reader_thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.raw.close()
+        self.annotated.close()
+
+    def attach(self, ai):
+        with self._lock:
+            self.viewers += 1
+            if ai:
+                self.ai_viewers += 1
+                if self._infer_thread is None:
+                    self._infer_thread = threading.Thread(target=self._infer_loop, name="stream-infer", daemon=True)
+                    self._infer_thread.start()
+            return self.viewers
+
+    def detach(self, ai):
+        with self._lock:
+            self.viewers -= 1
+            if ai:
+                self.ai_viewers -= 1
+            return self.viewers
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "camera_id": self.camera_id,
+            "viewers": self.viewers,
+            "ai_viewers": self.ai_viewers,
+            "frames_read": self.frames_read,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "frames_inferred": self.frames_inferred,
+            "frames_reused": self.frames_reused,
+        }
+
+    def _read_loop(self):
+        try:
+            with requests.get(self.url, stream=True, timeout=self.read_timeout) as r:
+                if r.status_code != 200:
+                    print(f"Stream returned status code: {r.status_code}")
+                    return
+
+                boundary = MJPEGParser.boundary_from_content_type(r.headers.get("Content-Type"))
+                for jpg in iter_frames(r.iter_content(chunk_size=16384), boundary=boundary):
+                    if self._stopped.is_set():
+                        break
+                    self.frames_read += 1
+                    self.raw.put(jpg)
+        except Exception as e:
+            print(f"Stream error: {e}")
+        finally:
+            self.stop()
+
+    def _infer_loop(self):
+        seq = 0
+        detections = None
+        last_inference = 0.0
+        while not self._stopped.is_set():
+            with self._lock:
+                if self.ai_viewers <= 0:
+                    # Exit and hand-off under the lock: attach() starts a new thread from here on
+                    self._infer_thread = None
+                    return
+            prev_seq = seq
+            seq, jpg = self.raw.get(seq, timeout=1.0)
+            if jpg is None:
+                continue
+            if prev_seq:
+                self.frames_dropped += seq - prev_seq - 1
+
+            # Decode to opencv image
+            with time_stage("decode"):
+                img = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                continue
+
+            moved = self.motion.moved(img)
+            now = time.monotonic()
+            if (detections is None or not self.motion.enabled or moved
+                    or now - last_inference >= self.keyframe_interval):
+                found = self.ai_engine.detect_frame(img, self.zone_map)
+                if found is not None:
+                    detections = found
+                    last_inference = now
+                    self.motion.keyframe()
+                    self.frames_inferred += 1
+            else:
+                # Static scene: keep the last detections
+                self.frames_reused += 1
+
+            if detections:
+                with time_stage("plot"):
+                    draw_detections(img, detections)
+            with time_stage("encode"):
+                ret, buffer = cv2.imencode('.jpg', img)
+            if ret:
+                self.frames_processed += 1
+                self.annotated.put(buffer.tobytes())
+
+    async def frames(self, ai=True, poll_timeout=1.0):
+        """Yield multipart chunks of the newest frames until the stream ends."""
+        slot = self.annotated if ai else self.raw
+        seq = 0
+        while True:
+            seq, jpg = await slot.get_async(seq, timeout=poll_timeout)
+            if jpg is not None:
+                yield multipart_chunk(jpg)
+            elif slot.closed:
+                return
+
+
+class StreamHub:
+    """
+    Per-URL broadcast hub. All viewers of the same camera URL share one
+    upstream connection and one annotated frame sequence; the pipeline is
+    torn down when the last viewer leaves.
+    """
+
+    def __init__(self, ai_engine):
+        self.ai_engine = ai_engine
+        self._pipelines = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url, ai=True, camera=None):
+        with self._lock:
+            pipeline = self._pipelines.get(url)
+            if pipeline is None or pipeline.closed:
+                # First viewer, or the previous upstream connection died
+                pipeline = StreamPipeline(url, self.ai_engine,
+                                          zone_map=camera.zone_map if camera else None,
+                                          camera_id=camera.id if camera else None).start()
+                self._pipelines[url] = pipeline
+            pipeline.attach(ai)
+            return pipeline
+
+    def release(self, pipeline, ai=True):
+        with self._lock:
+            if pipeline.detach(ai) > 0:
+                return
+            pipeline.stop()
+            if self._pipelines.get(pipeline.url) is pipeline:
+                del self._pipelines[pipeline.url]
+
+        stats = pipeline.stats()
+        print(f"Stream closed: {stats['url']} {stats['frames_read']} read, "
+              f"{stats['frames_processed']} processed ({stats['frames_inferred']} inferred), "
+              f"{stats['frames_dropped']} dropped")
+
+    async def stream(self, url, ai=True, camera=None):
+        """
+        Async generator for StreamingResponse: subscribes one viewer for its
+        lifetime. `camera` (a registered Camera) supplies the zone map.
+
+        Async so that a client disconnect cancels it and `finally` runs right
+        away; a sync generator is only closed when it is garbage collected,
+        which kept the viewer counted and the pipeline running. Frames are
+        awaited on the event loop, so viewers don't hold the worker threads
+        that sync endpoints run on.
+        """
+        pipeline = self.acquire(url, ai, camera)
+        try:
+            async for chunk in pipeline.frames(ai=ai):
+                yield chunk
+        finally:
+            self.release(pipeline, ai)
+
+    def stats(self):
+        with self._lock:
+            return [p.stats() for p in self._pipelines.values()]
@@ -0,0 +1,196 @@
+import json
+import os
+
+import numpy as np
+
+GRID_SIZE = 32
+
+NO_ZONE = -1      # cell touches no zone: use the left/middle/right fallback
+NEEDS_TEST = -2   # cell is partly covered: test the point against polygons
+
+
+FALLBACK_DESCRIPTIONS = ["左侧", "中间", "右侧"]
+
+
+def fallback_description(x_center_norm):
+    # Simple horizontal fallback if no zones match
+    if x_center_norm < 0.33:
+        return "左侧"
+    elif x_center_norm > 0.66:
+        return "右侧"
+    return "中间"
+
+
+class Zone:
+    """
+    One named area of the camera view, in normalized coordinates.
+    zones.json entries are either rectangles (x_min/y_min/x_max/y_max) or
+    polygons ("polygon": [[x, y], ...]); "priority" (default 0) decides
+    which zone wins where zones overlap. "motion": false excludes the zone
+    from stream motion detection (see motion.py).
+    """
+
+    def __init__(self, name, data, order):
+        self.name = name
+        self.description = data["description"]
+        self.priority = data.get("priority", 0)
+        self.motion = data.get("motion", True)
+        self.order = order
+
+        if "polygon" in data:
+            self.polygon = np.asarray(data["polygon"], dtype=np.float64)
+            self.x_min, self.y_min = self.polygon.min(axis=0)
+            self.x_max, self.y_max = self.polygon.max(axis=0)
+        else:
+            self.polygon = None
+            self.x_min, self.y_min = data["x_min"], data["y_min"]
+            self.x_max, self.y_max = data["x_max"], data["y_max"]
+
+    def contains(self, xs, ys):
+        """Vectorized point-in-zone test; rectangles include their edges."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        in_bbox = (xs >= self.x_min) & (xs <= self.x_max) & (ys >= self.y_min) & (ys <= self.y_max)
+        if self.polygon is None:
+            return in_bbox
+
+        # Even-odd ray casting against every edge at once
+        x0, y0 = self.polygon[:, 0], self.polygon[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        px, py = xs[..., None], ys[..., None]
+        straddles = (y0 > py) != (y1 > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        crossings = np.count_nonzero(straddles & (px < x_cross), axis=-1)
+        return in_bbox & (crossings % 2 == 1)
+
+    def covers_box(self, x0, y0, x1, y1):
+        """True if the whole closed box lies inside the zone."""
+        if self.polygon is None:
+            return self.x_min <= x0 and x1 <= self.x_max and self.y_min <= y0 and y1 <= self.y_max
+
+        corners_x = np.array([x0, x1, x1, x0])
+        corners_y = np.array([y0, y0, y1, y1])
+        if not self.contains(corners_x, corners_y).all():
+            return False
+        # All corners inside; the box is covered unless an edge cuts through it
+        edges = zip(self.polygon, np.roll(self.polygon, -1, axis=0))
+        return not any(_segment_hits_box(a, b, x0, y0, x1, y1) for a, b in edges)
+
+
+def _segment_hits_box(a, b, x0, y0, x1, y1):
+    """Liang-Barsky clip: does segment a-b pass through the box?"""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, a[0] - x0), (dx, x1 - a[0]), (-dy, a[1] - y0), (dy, y1 - a[1])):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                return False
+    return True
+
+
+class ZoneMap:
+    """
+    Zone lookup backed by a uniform grid over the unit square.
+
+    Each cell stores the zones whose bounding box touches it, best priority
+    first. Cells fully covered by their best zone are resolved up front, so
+    most lookups are one array index; only cells on zone borders fall back
+    to exact point-in-polygon tests.
+    """
+
+    def __init__(self, zones_data, grid_size=GRID_SIZE):
+        self.grid_size = grid_size
+        zones = [Zone(name, data, i) for i, (name, data) in enumerate(zones_data.items())]
+        # Highest priority first; file order breaks ties
+        self.zones = sorted(zones, key=lambda z: (-z.priority, z.order))
+        self.descriptions = np.array([z.description for z in self.zones] + [""], dtype=object)
+
+        cells = grid_size * grid_size
+        self.cell_zone = np.full(cells, NO_ZONE, dtype=np.int32)
+        self.cell_candidates = [[] for _ in range(cells)]
+
+        step = 1.0 / grid_size
+        for zi, zone in enumerate(self.zones):
+            # Same floor(v * grid_size) rule as the lookup, so edges stay consistent
+            cx0 = max(0, int(np.floor(zone.x_min * grid_size)))
+            cx1 = min(grid_size - 1, int(np.floor(zone.x_max * grid_size)))
+            cy0 = max(0, int(np.floor(zone.y_min * grid_size)))
+            cy1 = min(grid_size - 1, int(np.floor(zone.y_max * grid_size)))
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    self.cell_candidates[cy * grid_size + cx].append(zi)
+
+        for cell, candidates in enumerate(self.cell_candidates):
+            if not candidates:
+                continue
+            cy, cx = divmod(cell, grid_size)
+            box = (cx * step, cy * step, (cx + 1) * step, (cy + 1) * step)
+            self.cell_zone[cell] = candidates[0] if self.zones[candidates[0]].covers_box(*box) else NEEDS_TEST
+
+    @classmethod
+    def load(cls, zones_path):
+        if os.path.exists(zones_path):
+            try:
+                with open(zones_path, 'r', encoding='utf-8') as f:
+                    return cls(json.load(f))
+            except Exception as e:
+                print(f"Error loading zones: {e}")
+        return cls({})
+
+    def all_descriptions(self):
+        """Every location text this map can produce, including the fallbacks."""
+        return list(dict.fromkeys([z.description for z in self.zones] + FALLBACK_DESCRIPTIONS))
+
+    def _cells(self, xs, ys):
+        g = self.grid_size
+        cx = np.clip((xs * g).astype(np.int64), 0, g - 1)
+        cy = np.clip((ys * g).astype(np.int64), 0, g - 1)
+        return cy * g + cx
+
+    def zone_indices(self, xs, ys):
+        """Index into self.zones for every point (NO_ZONE where none matches)."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        result = self.cell_zone[self._cells(xs, ys)]
+
+        pending = np.flatnonzero(result == NEEDS_TEST)
+        if pending.size:
+            px, py = xs[pending], ys[pending]
+            found = np.full(pending.size, NO_ZONE, dtype=np.int32)
+            # Zones are in priority order: the first one containing a point wins
+            for zi, zone in enumerate(self.zones):
+                hit = (found == NO_ZONE) & zone.contains(px, py)
+                found[hit] = zi
+            result[pending] = found
+        return result
+
+    def describe_many(self, xs, ys):
+        """Zone descriptions for arrays of normalized box centers."""
+        xs = np.asarray(xs, dtype=np.float64)
+        indices = self.zone_indices(xs, ys)
+        descriptions = self.descriptions[indices].tolist() if len(indices) else []
+        return [desc if zi != NO_ZONE else fallback_description(x)
+                for desc, zi, x in zip(descriptions, indices, xs)]
+
+    def describe(self, x_center_norm, y_center_norm):
+        g = self.grid_size
+        cell = min(max(int(y_center_norm * g), 0), g - 1) * g + min(max(int(x_center_norm * g), 0), g - 1)
+        zi = self.cell_zone[cell]
+        if zi == NEEDS_TEST:
+            zi = NO_ZONE
+            for candidate in self.cell_candidates[cell]:
+                if self.zones[candidate].contains(x_center_norm, y_center_norm):
+                    zi = candidate
+                    break
+        if zi == NO_ZONE:
+            return fallback_description(x_center_norm)
+        return self.zones[zi].description
@@ -0,0 +1,114 @@
+"""
+/query latency vs. history size.
+
+Seeds a throw-away SQLite database with N detections of common classes plus
+a fixed number of "wallet" sightings, then times the /query code path
+(alias resolution + SQL + serialization) for "钱包". With image URLs stored
+at ingest time the cost should track the number of matches, not the size
+of the history.
+
+Usage: python benchmarks/bench_query.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, Capture, Detection
+from search import query_sightings
+from aliases import AliasIndex
+
+COMMON_CLASSES = ["person", "cup", "bottle", "keyboard", "mouse", "cell phone", "book", "laptop"]
+ZONES = ["沙发区", "茶几上", "电视柜", "地板上", "玄关/门口"]
+DETECTIONS_PER_CAPTURE = 4
+
+
+def seed(engine, n_detections, n_matches):
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    n_captures = max(1, n_detections // DETECTIONS_PER_CAPTURE)
+    stride = max(1, n_detections // max(1, n_matches))
+
+    with engine.begin() as conn:
+        conn.execute(Capture.__table__.insert(), [
+            {
+                "id": i + 1,
+                "image_path": f"images/{i}.jpg",
+                "width": 1600,
+                "height": 1200,
+                "annotated": False,
+                "image_url": f"/annotated/{i}.jpg",
+                "timestamp": start + timedelta(seconds=30 * i),
+            }
+            for i in range(n_captures)
+        ])
+
+        rows = []
+        for i in range(n_detections):
+            capture_id = i // DETECTIONS_PER_CAPTURE + 1
+            name = "wallet" if n_matches and i % stride == 0 else rng.choice(COMMON_CLASSES)
+            rows.append({
+                "capture_id": capture_id,
+                "name": name,
+                "confidence": rng.uniform(0.15, 0.95),
+                "x1": 0.1, "y1": 0.1, "x2": 0.3, "y2": 0.3,
+                "zone": rng.choice(ZONES),
+                "timestamp": start + timedelta(seconds=30 * (capture_id - 1)),
+            })
+            if len(rows) >= 50000:
+                conn.execute(Detection.__table__.insert(), rows)
+                rows = []
+        if rows:
+            conn.execute(Detection.__table__.insert(), rows)
+
+
+def bench(n_detections, n_matches, aliases, repeats):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        seed(engine, n_detections, n_matches)
+
+        timings = []
+        with session_factory() as db:
+            query_sightings(db, "钱包", aliases) # warm caches
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                response = query_sightings(db, "钱包", aliases)
+                timings.append((time.perf_counter() - t0) * 1000)
+        engine.dispose()
+
+    return {
+        "history_rows": n_detections,
+        "matches": len(response["items"]),
+        "p50_ms": statistics.median(timings),
+        "max_ms": max(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    aliases = AliasIndex(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "aliases.json"))
+
+    print(f"{'history rows':>12} {'matches':>8} {'p50 ms':>8} {'max ms':>8}")
+    for size in args.sizes:
+        r = bench(size, args.matches, aliases, args.repeats)
+        print(f"{r['history_rows']:>12} {r['matches']:>8} {r['p50_ms']:>8.2f} {r['max_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Accuracy/latency comparison of the inference backends against PyTorch.
+
+Loads every requested backend through model_backends.load_model(), runs
+each one over the same images one at a time (after a warmup), and passes
+the results through the production postprocess(). Detections are matched
+to the torch detections of the same image (same class, IoU >= --iou), and
+the report lists latency percentiles plus agreement with torch: recall
+(torch boxes found), precision (boxes that torch also has), mean IoU of
+matched boxes and the largest confidence difference.
+
+Usage: python benchmarks/compare_backends.py --images backend/images \\
+           [--backends torch onnx onnx-int8 openvino] [--limit 50] [--output report.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import cv2
+import numpy as np
+
+from ai_engine import CUSTOM_CLASSES
+from model_backends import BACKENDS, load_model
+from postprocess import postprocess
+from zones import ZoneMap
+
+
+def find_images(root, limit):
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        paths += [os.path.join(dirpath, f) for f in filenames if f.lower().endswith((".jpg", ".jpeg", ".png"))]
+    return sorted(paths)[:limit]
+
+
+def iou(a, b):
+    w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = w * h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match(reference, candidate, iou_threshold):
+    """Greedy one-to-one matching by class and IoU, best confidence first."""
+    pairs = []
+    used = set()
+    for ref in sorted(reference, key=lambda d: -d["confidence"]):
+        best, best_iou = None, iou_threshold
+        for i, det in enumerate(candidate):
+            if i in used or det["name"] != ref["name"]:
+                continue
+            overlap = iou(ref["bbox"], det["bbox"])
+            if overlap >= best_iou:
+                best, best_iou = i, overlap
+        if best is not None:
+            used.add(best)
+            pairs.append((ref, candidate[best], best_iou))
+    return pairs
+
+
+def run_backend(name, images, zone_map, warmup):
+    model = load_model(name, CUSTOM_CLASSES, fallback=False)
+    if model is None:
+        raise RuntimeError("model failed to load")
+    frames = [cv2.imread(path) for path in images]
+    for frame in frames[:warmup]:
+        model(frame, verbose=False)
+
+    timings, detections = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        result = model(frame, verbose=False)[0]
+        timings.append((time.perf_counter() - t0) * 1000)
+        detections.append(postprocess(result, model.names, zone_map))
+    return timings, detections
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="directory of sample frames (searched recursively)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    images = find_images(args.images, args.limit)
+    if not images:
+        sys.exit(f"No images found in {args.images}")
+    zone_map = ZoneMap({})
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    runs = {}
+    for name in backends:
+        print(f"Running {name} on {len(images)} images...")
+        try:
+            runs[name] = run_backend(name, images, zone_map, args.warmup)
+        except Exception as e:
+            print(f"  skipped: {e}")
+
+    if "torch" not in runs:
+        sys.exit("The torch reference run failed")
+    reference = runs["torch"][1]
+
+    report = []
+    for name, (timings, detections) in runs.items():
+        n_ref = n_found = n_matched = 0
+        ious, conf_deltas = [], []
+        for ref, found in zip(reference, detections):
+            pairs = match(ref, found, args.iou)
+            n_ref += len(ref)
+            n_found += len(found)
+            n_matched += len(pairs)
+            ious += [overlap for _, _, overlap in pairs]
+            conf_deltas += [abs(a["confidence"] - b["confidence"]) for a, b, _ in pairs]
+        report.append({
+            "backend": name,
+            "images": len(images),
+            "p50_ms": percentile(timings, 50),
+            "p95_ms": percentile(timings, 95),
+            "mean_ms": statistics.fmean(timings),
+            "detections": n_found,
+            "recall_vs_torch": n_matched / n_ref if n_ref else 1.0,
+            "precision_vs_torch": n_matched / n_found if n_found else 1.0,
+            "mean_iou": statistics.fmean(ious) if ious else None,
+            "max_conf_delta": max(conf_deltas) if conf_deltas else None,
+        })
+
+    torch_p50 = report[0]["p50_ms"]
+    print(f"\n{'backend':>10} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8} {'dets':>6} "
+          f"{'recall':>7} {'prec':>7} {'mIoU':>6} {'max dconf':>9}")
+    for r in report:
+        mean_iou = f"{r['mean_iou']:.3f}" if r["mean_iou"] is not None else "-"
+        max_dconf = f"{r['max_conf_delta']:.3f}" if r["max_conf_delta"] is not None else "-"
+        print(f"{r['backend']:>10} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {torch_p50 / r['p50_ms']:>7.2f}x "
+              f"{r['detections']:>6} {r['recall_vs_torch']:>7.3f} {r['precision_vs_torch']:>7.3f} "
+              f"{mean_iou:>6} {max_dconf:>9}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Simulated ESP32 cameras for load testing without hardware.
+
+Each camera does what firmware/esp32_camera does:
+  - serves GET /stream on its own port: multipart/x-mixed-replace with
+    boundary "frame" and a Content-Length per part, at --fps
+  - POSTs a still to the backend's /upload every --interval seconds
+    (the firmware's captureInterval) as multipart field "file"
+Frames come from a folder of JPEGs (cycled, each camera starting at a
+different offset) or, without --images, from synthetic frames.
+
+Uploads carry X-Camera-Id: cam-<n>, so the backend treats each simulated
+camera as its own source even though they share one IP address.
+
+Usage: python benchmarks/fake_cameras.py --cameras 4 [--base-port 9001]
+           [--upload-url http://localhost:8001/upload] [--interval 5] [--images DIR]
+Stream URLs are http://127.0.0.1:<base-port + n>/stream. Ctrl+C prints upload stats.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import requests
+
+BOUNDARY = "frame"
+
+
+def load_frames(image_dir=None, count=20, size=(800, 600)):
+    """JPEG bytes from `image_dir` (searched recursively) or synthetic frames."""
+    if image_dir:
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(image_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            paths += [os.path.join(dirpath, f) for f in filenames if f.lower().endswith((".jpg", ".jpeg"))]
+        frames = []
+        for path in sorted(paths)[:count * 10]:
+            with open(path, "rb") as f:
+                frames.append(f.read())
+        if frames:
+            return frames
+        print(f"No JPEGs found in {image_dir}, using synthetic frames")
+
+    # A white block moving across a dark, noisy background. The contrast has
+    # to clear motion.MOTION_PIXEL_DELTA after grayscale conversion, or
+    # motion gating treats every frame as static and skips inference.
+    rng = np.random.default_rng(0)
+    w, h = size
+    frames = []
+    for i in range(count):
+        img = rng.integers(20, 40, (h, w, 3), dtype=np.uint8)
+        x = int((w - 120) * i / max(1, count - 1))
+        cv2.rectangle(img, (x, h // 3), (x + 120, h // 3 + 120), (255, 255, 255), -1)
+        frames.append(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+    return frames
+
+
+class FakeCamera:
+    def __init__(self, index, frames, port, fps=10.0, upload_url=None, interval=5.0, host="127.0.0.1"):
+        self.camera_id = f"cam-{index}"
+        self.frames = frames
+        self.offset = (index * 7) % len(frames)
+        self.port = port
+        self.host = host
+        self.fps = fps
+        self.upload_url = upload_url
+        self.interval = interval
+
+        self.stream_clients = 0
+        self.frames_served = 0
+        self.uploads_ok = 0
+        self.uploads_failed = 0
+        self.upload_latencies = []  # seconds
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        # Listen on all interfaces; `host` is the address put in stream_url
+        self._server = ThreadingHTTPServer(("", port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def stream_url(self):
+        return f"http://{self.host}:{self.port}/stream"
+
+    def frame(self, n):
+        return self.frames[(self.offset + n) % len(self.frames)]
+
+    def _handler(self):
+        camera = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.0"
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/stream":
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.end_headers()
+                with camera._lock:
+                    camera.stream_clients += 1
+                n = 0
+                try:
+                    while not camera._stopped.is_set():
+                        jpg = camera.frame(n)
+                        self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                         f"Content-Length: {len(jpg)}\r\n\r\n".encode())
+                        self.wfile.write(jpg)
+                        self.wfile.write(b"\r\n")
+                        n += 1
+                        with camera._lock:
+                            camera.frames_served += 1
+                        time.sleep(1.0 / camera.fps)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with camera._lock:
+                        camera.stream_clients -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name=f"{self.camera_id}-http", daemon=True).start()
+        if self.upload_url and self.interval > 0:
+            threading.Thread(target=self._upload_loop, name=f"{self.camera_id}-upload", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _upload_loop(self):
+        # Random phase so the fleet doesn't upload in lockstep
+        if self._stopped.wait(random.uniform(0, self.interval)):
+            return
+        n = 0
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            try:
+                r = requests.post(self.upload_url, files={"file": ("capture.jpg", self.frame(n), "image/jpeg")},
+                                  headers={"X-Camera-Id": self.camera_id}, timeout=30)
+                ok = r.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.monotonic() - started
+            with self._lock:
+                if ok:
+                    self.uploads_ok += 1
+                    self.upload_latencies.append(elapsed)
+                else:
+                    self.uploads_failed += 1
+            n += 1
+            self._stopped.wait(max(0.0, self.interval - elapsed))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "camera_id": self.camera_id,
+                "stream_url": self.stream_url,
+                "stream_clients": self.stream_clients,
+                "frames_served": self.frames_served,
+                "uploads_ok": self.uploads_ok,
+                "uploads_failed": self.uploads_failed,
+                "upload_latencies": list(self.upload_latencies),
+            }
+
+
+class CameraFleet:
+    """N fake cameras on consecutive ports."""
+
+    def __init__(self, count, base_port=9001, frames=None, fps=10.0, upload_url=None, interval=5.0,
+                 host="127.0.0.1"):
+        frames = frames or load_frames()
+        self.cameras = [FakeCamera(i, frames, base_port + i, fps, upload_url, interval, host)
+                        for i in range(count)]
+
+    @property
+    def stream_urls(self):
+        return [camera.stream_url for camera in self.cameras]
+
+    def start(self):
+        for camera in self.cameras:
+            camera.start()
+        return self
+
+    def stop(self):
+        for camera in self.cameras:
+            camera.stop()
+
+    def stats(self):
+        return [camera.stats() for camera in self.cameras]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--base-port", type=int, default=9001)
+    parser.add_argument("--fps", type=float, default=10.0, help="stream frame rate per camera")
+    parser.add_argument("--upload-url", default="http://localhost:8001/upload",
+                        help="backend /upload URL; empty to only serve streams")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between uploads per camera")
+    parser.add_argument("--images", help="directory of JPEG frames (default: synthetic)")
+    parser.add_argument("--host", default="127.0.0.1", help="address the backend uses to reach the cameras")
+    args = parser.parse_args()
+
+    fleet = CameraFleet(args.cameras, args.base_port, load_frames(args.images), args.fps,
+                        args.upload_url or None, args.interval, args.host).start()
+    for url in fleet.stream_urls:
+        print(f"Serving {url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    fleet.stop()
+
+    for s in fleet.stats():
+        latencies = sorted(s["upload_latencies"])
+        p50 = f"{latencies[len(latencies) // 2] * 1000:.0f} ms" if latencies else "-"
+        print(f"{s['camera_id']}: {s['frames_served']} frames served, {s['uploads_ok']} uploads "
+              f"({s['uploads_failed']} failed), upload p50 {p50}")
+
+
+if __name__ == "__main__":
+    main()
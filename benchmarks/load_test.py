@@ -0,0 +1,239 @@
+"""
+End-to-end load test against a running backend.
+
+Starts --cameras simulated ESP32 cameras (see fake_cameras.py) that stream
+MJPEG and upload stills to the backend, then for --duration seconds runs
+  --viewers  concurrent /proxy_stream viewers, spread over the cameras
+  --queries  concurrent /query clients, each issuing requests back to back
+and reports throughput and p50/p95/p99 latencies:
+  viewers   time to first annotated frame, gap between frames, frames/s
+  queries   request latency, requests/s, errors
+  uploads   /upload latency as seen by the cameras, uploads/s
+At the end /metrics is scraped for queue depths, so a run that saturates
+the backend shows where work piles up (inference, DB writer, ingest jobs).
+Raise the load between runs until latencies climb or queues grow.
+
+Usage: python benchmarks/load_test.py --server http://localhost:8001 \\
+           --cameras 4 --viewers 8 --queries 4 --duration 60 [--interval 5] [--output load.json]
+Use --stream-url (repeatable) to view existing cameras instead of simulated ones.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import requests
+
+from fake_cameras import CameraFleet, load_frames
+from mjpeg import MJPEGParser
+
+QUERY_TERMS = ["钱包", "钥匙", "杯子", "手机", "遥控器", "cup", "keys", "茶几上的杯子"]
+QUEUE_GAUGES = ("findit_inference_queue_depth", "findit_db_writer_queue_depth", "findit_ingest_jobs_pending")
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000
+    return {
+        "count": len(values),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+class Viewer(threading.Thread):
+    """Reads one /proxy_stream until the deadline, timing every frame."""
+
+    def __init__(self, server, stream_url, deadline, ai=True):
+        super().__init__(daemon=True)
+        self.url = f"{server}/proxy_stream"
+        self.params = {"url": stream_url, "ai": str(ai).lower()}
+        self.deadline = deadline
+        self.first_frame = None
+        self.gaps = []
+        self.frames = 0
+        self.error = None
+
+    def run(self):
+        started = time.monotonic()
+        try:
+            with requests.get(self.url, params=self.params, stream=True, timeout=30) as r:
+                r.raise_for_status()
+                parser = MJPEGParser(MJPEGParser.boundary_from_content_type(r.headers.get("Content-Type")))
+                last = None
+                for chunk in r.iter_content(chunk_size=16384):
+                    now = time.monotonic()
+                    for _ in parser.feed(chunk):
+                        self.frames += 1
+                        if last is None:
+                            self.first_frame = now - started
+                        else:
+                            self.gaps.append(now - last)
+                        last = now
+                    if now >= self.deadline:
+                        break
+        except Exception as e:
+            self.error = str(e)
+
+
+class QueryClient(threading.Thread):
+    """Issues /query requests back to back until the deadline."""
+
+    def __init__(self, server, deadline, terms=QUERY_TERMS, seed=0):
+        super().__init__(daemon=True)
+        self.url = f"{server}/query"
+        self.deadline = deadline
+        self.terms = terms
+        self.rng = random.Random(seed)
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        with requests.Session() as session:
+            while time.monotonic() < self.deadline:
+                started = time.monotonic()
+                try:
+                    r = session.get(self.url, params={"q": self.rng.choice(self.terms)}, timeout=30)
+                    ok = r.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                if ok:
+                    self.latencies.append(time.monotonic() - started)
+                else:
+                    self.errors += 1
+
+
+def scrape_gauges(server, names=QUEUE_GAUGES):
+    try:
+        text = requests.get(f"{server}/metrics", timeout=5).text
+    except requests.RequestException:
+        return {}
+    values = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(" ")
+        if name in names:
+            values[name] = float(value)
+    return values
+
+
+def print_row(label, stats, rate, unit):
+    if not stats.get("count"):
+        print(f"{label:>10} {'-':>8}")
+        return
+    print(f"{label:>10} {stats['count']:>8} {rate:>8.1f} {unit:<6} {stats['p50_ms']:>9.1f} "
+          f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", default="http://localhost:8001")
+    parser.add_argument("--cameras", type=int, default=4, help="simulated cameras to start")
+    parser.add_argument("--base-port", type=int, default=9001)
+    parser.add_argument("--camera-host", default="127.0.0.1",
+                        help="address the backend uses to reach the simulated cameras")
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="seconds between uploads per camera (0: no uploads)")
+    parser.add_argument("--images", help="directory of JPEG frames for the cameras (default: synthetic)")
+    parser.add_argument("--stream-url", action="append", default=[],
+                        help="view this stream instead of simulated ones (repeatable)")
+    parser.add_argument("--viewers", type=int, default=4)
+    parser.add_argument("--no-ai", action="store_true", help="view streams without inference")
+    parser.add_argument("--queries", type=int, default=2, help="concurrent /query clients")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        requests.get(f"{args.server}/", timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        sys.exit(f"Backend not reachable at {args.server}: {e}")
+
+    fleet = None
+    stream_urls = args.stream_url
+    if not stream_urls and args.cameras:
+        fleet = CameraFleet(args.cameras, args.base_port, load_frames(args.images), args.fps,
+                            f"{args.server}/upload" if args.interval > 0 else None, args.interval,
+                            args.camera_host).start()
+        stream_urls = fleet.stream_urls
+        print(f"Started {args.cameras} simulated cameras on ports {args.base_port}-{args.base_port + args.cameras - 1}")
+
+    print(f"Running {args.viewers} viewers and {args.queries} query clients for {args.duration:.0f}s...")
+    started = time.monotonic()
+    deadline = started + args.duration
+    viewers = [Viewer(args.server, stream_urls[i % len(stream_urls)], deadline, ai=not args.no_ai)
+               for i in range(args.viewers)] if stream_urls else []
+    clients = [QueryClient(args.server, deadline, seed=i) for i in range(args.queries)]
+    for worker in viewers + clients:
+        worker.start()
+    for worker in viewers + clients:
+        worker.join(timeout=args.duration + 60)
+    elapsed = time.monotonic() - started
+    gauges = scrape_gauges(args.server)
+
+    camera_stats = []
+    if fleet:
+        fleet.stop()
+        camera_stats = fleet.stats()
+
+    query_latencies = [latency for c in clients for latency in c.latencies]
+    upload_latencies = [latency for s in camera_stats for latency in s["upload_latencies"]]
+    frames = sum(v.frames for v in viewers)
+    report = {
+        "server": args.server,
+        "duration_s": elapsed,
+        "cameras": len(stream_urls),
+        "viewers": {
+            "count": len(viewers),
+            "errors": [v.error for v in viewers if v.error],
+            "frames": frames,
+            "frames_per_s_per_viewer": frames / elapsed / len(viewers) if viewers else 0.0,
+            "first_frame": percentiles([v.first_frame for v in viewers if v.first_frame is not None]),
+            "frame_gap": percentiles([gap for v in viewers for gap in v.gaps]),
+        },
+        "queries": {
+            "clients": len(clients),
+            "errors": sum(c.errors for c in clients),
+            "requests_per_s": len(query_latencies) / elapsed,
+            "latency": percentiles(query_latencies),
+        },
+        "uploads": {
+            "ok": sum(s["uploads_ok"] for s in camera_stats),
+            "failed": sum(s["uploads_failed"] for s in camera_stats),
+            "uploads_per_s": len(upload_latencies) / elapsed,
+            "latency": percentiles(upload_latencies),
+        },
+        "queues_at_end": gauges,
+    }
+
+    v, q, u = report["viewers"], report["queries"], report["uploads"]
+    print(f"\n{'':>10} {'count':>8} {'rate':>8} {'':<6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print_row("1st frame", v["first_frame"], v["frames_per_s_per_viewer"], "fps/v")
+    print_row("frame gap", v["frame_gap"], v["frames_per_s_per_viewer"], "fps/v")
+    print_row("query", q["latency"], q["requests_per_s"], "req/s")
+    print_row("upload", u["latency"], u["uploads_per_s"], "up/s")
+    if v["errors"]:
+        print(f"Viewer errors: {v['errors']}")
+    if q["errors"] or u["failed"]:
+        print(f"Failed queries: {q['errors']}, failed uploads: {u['failed']}")
+    if gauges:
+        print("Queues at end: " + ", ".join(f"{name}={value:.0f}" for name, value in gauges.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Offline micro-benchmarks for the backend hot paths.
+
+Needs no server, camera, network or model weights:
+  mjpeg     MJPEG parsing as done by /proxy_stream (iter_frames over 16 KB
+            chunks of a synthetic ESP32 stream, with and without Content-Length)
+  zones     AIEngine.get_location_description(s) with backend/zones.json
+  aliases   AliasIndex.resolve() as used by /query, for exact, partial,
+            compound and unknown queries
+  query     the /query code path (query_sightings) on a throw-away database
+            of 1k / 100k / 1M detections (see bench_query.py)
+  analyze   AIEngine.analyze_image() through the inference scheduler and
+            postprocess(), with a stub model in place of YOLO
+
+Results are written as JSON to benchmarks/results/<commit>.json (plus
+machine details); --compare prints the change against an earlier file, e.g.
+the result of the previous commit, and marks slowdowns beyond --threshold.
+
+Usage: python benchmarks/run_benchmarks.py [--only mjpeg zones ...] [--sizes 1000 100000]
+           [--output FILE] [--compare benchmarks/results/<old commit>.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import cv2
+import numpy as np
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BENCHMARKS = ("mjpeg", "zones", "aliases", "query", "analyze")
+ALIAS_QUERIES = {
+    "exact": "钱包",
+    "partial": "钥",
+    "compound": "茶几上的杯子和钥匙",
+    "english": "cell phone",
+    "unknown": "xyzzy",
+}
+
+
+def measure(fn, repeats, number=1):
+    """Per-call latency stats in microseconds over `repeats` rounds of `number` calls."""
+    fn()  # warm caches
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - t0) / number * 1e6)
+    timings.sort()
+    return {
+        "p50_us": statistics.median(timings),
+        "p95_us": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "mean_us": statistics.fmean(timings),
+    }
+
+
+def synthetic_jpegs(count, size=(640, 480), seed=0):
+    """Distinct JPEG frames of realistic size (smooth gradient plus noise)."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    base = np.linspace(0, 255, w, dtype=np.float32)[None, :, None].repeat(h, 0).repeat(3, 2)
+    frames = []
+    for _ in range(count):
+        img = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+        frames.append(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+    return frames
+
+
+def mjpeg_stream(frames, content_length=True):
+    # Byte-for-byte what firmware/esp32_camera serves on :81/stream
+    parts = []
+    for jpg in frames:
+        header = b"--frame\r\nContent-Type: image/jpeg\r\n"
+        if content_length:
+            header += b"Content-Length: %d\r\n" % len(jpg)
+        parts.append(header + b"\r\n" + jpg + b"\r\n")
+    return b"".join(parts)
+
+
+def bench_mjpeg(args):
+    from mjpeg import iter_frames
+
+    frames = synthetic_jpegs(50)
+    results = {}
+    for name, with_length in (("content_length", True), ("marker_scan", False)):
+        stream = mjpeg_stream(frames, with_length)
+        chunks = [stream[i:i + 16384] for i in range(0, len(stream), 16384)]
+
+        def parse():
+            n = sum(1 for _ in iter_frames(chunks, boundary="frame"))
+            assert n == len(frames), f"parsed {n} of {len(frames)} frames"
+
+        stats = measure(parse, args.repeats)
+        seconds = stats["p50_us"] / 1e6
+        results[name] = dict(stats, frames=len(frames), bytes=len(stream),
+                             mb_per_s=len(stream) / seconds / 1e6, frames_per_s=len(frames) / seconds)
+    return results
+
+
+def bench_zones(args):
+    from ai_engine import AIEngine
+
+    engine = AIEngine()  # loads zones.json; the model is not started
+    rng = random.Random(0)
+    points = [(rng.random(), rng.random()) for _ in range(1000)]
+    xs = np.array([p[0] for p in points[:50]])
+    ys = np.array([p[1] for p in points[:50]])
+
+    def single():
+        for x, y in points:
+            engine.get_location_description(x, y)
+
+    single_stats = measure(single, args.repeats)
+    # Per lookup rather than per 1000
+    single_stats = {k: v / len(points) for k, v in single_stats.items()}
+    return {
+        "zones": len(engine.zones),
+        "single": single_stats,
+        "frame_50_boxes": measure(lambda: engine.get_location_descriptions(xs, ys), args.repeats, 100),
+    }
+
+
+def bench_aliases(args):
+    from aliases import AliasIndex
+
+    index = AliasIndex(os.path.join(BACKEND_DIR, "aliases.json"))
+    return {name: measure(lambda q=q: index.resolve(q.lower()), args.repeats, 1000)
+            for name, q in ALIAS_QUERIES.items()}
+
+
+def bench_query(args):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from aliases import AliasIndex
+    from bench_query import seed
+    from database import Base
+    from search import query_sightings
+
+    aliases = AliasIndex(os.path.join(BACKEND_DIR, "aliases.json"))
+    results = {}
+    for size in args.sizes:
+        print(f"  seeding {size} detections...")
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(bind=engine)
+            seed(engine, size, args.matches)
+            with sessionmaker(bind=engine)() as db:
+                response = query_sightings(db, "钱包", aliases)
+                stats = measure(lambda: query_sightings(db, "钱包", aliases), args.repeats)
+                miss = measure(lambda: query_sightings(db, "umbrella", aliases), args.repeats)
+            engine.dispose()
+        results[str(size)] = {"matches": len(response["items"]), "hit": stats, "miss": miss}
+    return results
+
+
+class StubBoxes:
+    def __init__(self, cls, conf, xyxy):
+        self.cls, self.conf, self.xyxy = cls, conf, xyxy
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class StubResult:
+    def __init__(self, orig_shape, boxes):
+        self.orig_shape = orig_shape
+        self.boxes = boxes
+
+
+class StubModel:
+    """
+    Stands in for YOLO: decodes the image like predict() would and returns
+    a fixed set of boxes, so the timing covers everything except the network.
+    """
+
+    def __init__(self, names, boxes_per_image=20, seed=0):
+        self.names = dict(enumerate(names))
+        rng = np.random.default_rng(seed)
+        self.cls = rng.integers(0, len(names), boxes_per_image)
+        self.conf = rng.uniform(0.05, 0.95, boxes_per_image)
+        xy = rng.uniform(0, 0.8, (boxes_per_image, 2))
+        self.xyxy = np.hstack([xy, xy + rng.uniform(0.05, 0.2, (boxes_per_image, 2))])
+
+    def __call__(self, sources, **kwargs):
+        results = []
+        for source in sources:
+            img = cv2.imread(source) if isinstance(source, str) else source
+            h, w = img.shape[:2]
+            boxes = StubBoxes(self.cls, self.conf, self.xyxy * [w, h, w, h])
+            results.append(StubResult(img.shape, boxes))
+        return results
+
+
+def bench_analyze(args):
+    from ai_engine import AIEngine, CUSTOM_CLASSES
+    from inference import MAX_WAIT_MS
+
+    class StubEngine(AIEngine):
+        def _load_model(self):
+            return StubModel(CUSTOM_CLASSES)
+
+    # Same startup path as the server: scheduler, warmup, ready
+    engine = StubEngine()
+    if not engine.wait_until_ready(timeout=30):
+        raise RuntimeError("stub engine did not become ready")
+
+    # A lone request waits up to MAX_WAIT_MS for batch company
+    results = {"scheduler_max_wait_ms": MAX_WAIT_MS}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, size in (("vga", (640, 480)), ("uxga", (1600, 1200))):
+            path = os.path.join(tmp, f"{name}.jpg")
+            with open(path, "wb") as f:
+                f.write(synthetic_jpegs(1, size)[0])
+            detected, _ = engine.analyze_image(path)
+            results[name] = dict(measure(lambda: engine.analyze_image(path), args.repeats), detections=len(detected))
+    engine.scheduler.stop()
+    return results
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BENCH_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit, bool(dirty)
+    except Exception:
+        return "unknown", False
+
+
+def flatten(results, prefix=""):
+    """{"query": {"1000": {"hit": {"p50_us": ..}}}} -> {"query.1000.hit.p50_us": ..}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current, previous_path, threshold):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    old = flatten(previous["benchmarks"])
+    new = flatten(current["benchmarks"])
+    print(f"\nCompared with {previous.get('commit')} ({previous_path}), p50 latencies:")
+    regressions = 0
+    for name in sorted(new):
+        if not name.endswith("p50_us") or name not in old or not old[name]:
+            continue
+        ratio = new[name] / old[name]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"  {name:<45} {old[name]:>12.1f} -> {new[name]:>12.1f} us  {ratio:>5.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="history sizes (detections) for the query benchmark")
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--output", help="default: benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative p50 change reported as a regression (default 0.2)")
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "benchmarks": {},
+    }
+    for name in args.only:
+        print(f"Running {name}...")
+        t0 = time.perf_counter()
+        report["benchmarks"][name] = globals()[f"bench_{name}"](args)
+        print(f"  done in {time.perf_counter() - t0:.1f}s")
+
+    for name, value in flatten(report["benchmarks"]).items():
+        if name.endswith("p50_us"):
+            print(f"  {name:<45} {value:>12.1f} us")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {output}")
+
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
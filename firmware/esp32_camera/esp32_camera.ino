@@ -14,6 +14,9 @@
 unsigned long lastCaptureTime = 0;
 const int captureInterval = 30000; // 30 seconds
 
+// Id of this camera in backend/cameras.json (selects its zones)
+const char* camera_id = "living-room";
+
 // Web Server for streaming
 WiFiServer streamServer(81);
 
@@ -173,6 +176,7 @@ void takePictureAndUpload() {
       client.println("POST " + path + " HTTP/1.1");
       client.println("Host: " + host);
       client.println("Content-Type: " + contentType);
+      client.println("X-Camera-Id: " + String(camera_id));
       client.println("Content-Length: " + String(totalLen));
       client.println();
       
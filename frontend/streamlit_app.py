@@ -5,6 +5,7 @@ import pandas as pd
 import socket
 import streamlit.components.v1 as components
 import base64
+import time
 
 # Function to get local IP address
 def get_local_ip():
@@ -40,16 +41,25 @@ try:
 except Exception as e:
     status.error(f"Backend Offline: {e}")
 
-# Helper to fetch images
-def get_image_bytes(url):
-    try:
-        # For local, we can just fetch directly, but using this helper for consistency
-        res = requests.get(url, timeout=10)
-        if res.status_code == 200:
-            return res.content
-        return None
-    except:
-        return None
+# Registered cameras (backend/cameras.json); searches can be limited to one
+try:
+    cameras = requests.get(f"{BACKEND_URL}/cameras", timeout=5).json().get("cameras", [])
+except Exception:
+    cameras = []
+camera_names = {c["id"]: c["name"] for c in cameras}
+selected_camera = st.sidebar.selectbox("Camera", [None] + list(camera_names),
+                                       format_func=lambda c: "All cameras" if c is None else camera_names[c])
+camera_params = {"camera": selected_camera} if selected_camera else {}
+
+# Uploads are analyzed in the background; poll the job until it finishes
+def wait_for_job(result_url, timeout=60, interval=0.5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        res = requests.get(result_url, timeout=10)
+        if res.status_code != 202:
+            return res
+        time.sleep(interval)
+    return None
 
 # Tabs
 tab1, tab2, tab3, tab4 = st.tabs(["Search", "Live Feed / History", "Simulator (Upload)", "3D Room Map"])
@@ -89,6 +99,12 @@ with tab3:
                     status_text.text("Processing response...")
                     
                     if res.status_code == 200:
+                        status_text.text("Waiting for AI analysis...")
+                        res = wait_for_job(f"{BACKEND_URL}{res.json()['result_url']}")
+
+                    if res is None:
+                        st.error("Analysis timed out")
+                    elif res.status_code == 200:
                         data = res.json()
                         progress_bar.progress(100)
                         status_text.success("Complete!")
@@ -97,7 +113,7 @@ with tab3:
                         
                         if "annotated_url" in data:
                              st.subheader("👁️ AI Vision Analysis")
-                             annotated_img_url = f"{BACKEND_URL}{data['annotated_url']}"
+                             annotated_img_url = f"{BACKEND_URL}{data['annotated_url']}?w=640"
                              st.image(annotated_img_url, caption="Annotated Result", use_container_width=True)
                     else:
                         st.error(f"Upload failed: {res.status_code}")
@@ -112,7 +128,7 @@ with tab1:
     if st.button("Find"):
         if query:
             try:
-                res = requests.get(f"{BACKEND_URL}/query", params={"q": query})
+                res = requests.get(f"{BACKEND_URL}/query", params={"q": query, **camera_params})
                 data = res.json()
                 
                 if "items" in data and data["items"]:
@@ -121,11 +137,13 @@ with tab1:
                     for item in data["items"]:
                         col1, col2 = st.columns([1, 2])
                         with col1:
-                            # Construct full image URL
-                            img_url = f"{BACKEND_URL}{item['image_url']}"
+                            # Construct full image URL (a thumbnail is enough for the result list)
+                            img_url = f"{BACKEND_URL}{item['image_url']}?w=320"
                             st.image(img_url, caption=item['time'], use_container_width=True)
                         with col2:
-                            st.subheader(f"📍 {item['location']}")
+                            camera_label = camera_names.get(item.get("camera"), item.get("camera"))
+                            st.subheader(f"📍 {camera_label} · {item['location']}" if camera_label
+                                         else f"📍 {item['location']}")
                             st.write(f"**Detected Object:** {item['name']}")
                             st.write(f"**Time:** {item['time']}")
                             
@@ -153,6 +171,8 @@ with tab2:
                 status_data = res.json()
                 if status_data["status"] == "ok":
                     st.sidebar.success(f"✅ AI Model: {status_data['message']}")
+                elif status_data["status"] == "loading":
+                    st.sidebar.warning(f"⏳ AI Model: {status_data['message']}")
                 else:
                     st.sidebar.error(f"❌ AI Model: {status_data['message']}")
             else:
@@ -164,46 +184,39 @@ with tab2:
     # The frontend talks to LOCAL_IP:8000, and LOCAL_IP:8000 talks to ESP32
     esp_stream_url = f"http://{camera_ip}:81/stream"
     proxy_url = f"http://{LOCAL_IP}:8001/proxy_stream?url={esp_stream_url}&ai={str(ai_enabled).lower()}"
+    if selected_camera:
+        # Registered camera: its stream URL and zones come from the backend
+        proxy_url = f"{BACKEND_URL}/cameras/{selected_camera}/stream?ai={str(ai_enabled).lower()}"
     
     # Main Video Container - Make it full width and prominent
     st.image(proxy_url, use_container_width=True)
     
     st.markdown("---")
     st.header("Recent Detections")
-    # In a real app, we'd have a specific endpoint for recent items, 
-    # but for now we can query for everything or just show a placeholder
-    # Let's add a "Recent" endpoint to backend effectively by querying for common items
+    recent_window = st.selectbox("Time window", ["Any time", "Last hour", "Last 24 hours"])
+    window_minutes = {"Any time": None, "Last hour": 60, "Last 24 hours": 24 * 60}[recent_window]
     
     if st.button("Refresh Recent"):
-        # For demo, just query common items
-        common_items = ["person", "cup", "bottle", "keyboard", "mouse", "cell phone"]
-        found_any = False
-        
-        for item_name in common_items:
-            try:
-                res = requests.get(f"{BACKEND_URL}/query", params={"q": item_name})
-                data = res.json()
-                if "items" in data and data["items"]:
-                    found_any = True
-                    st.subheader(f"Recent '{item_name}'")
-                    # Show top 1
-                    item = data["items"][0]
-                    
-                    img_url = f"{BACKEND_URL}{item['image_url']}"
-                    # Use helper
-                    img_bytes = get_image_bytes(img_url)
-                    if img_bytes:
-                        st.image(img_bytes, width=300)
-                    else:
-                        st.warning("Image unavailable")
-                        
-                    st.write(f"Location: {item['location']} at {item['time']}")
-                    st.markdown("---")
-            except:
-                pass
+        # One request returns the latest sighting of every class
+        params = {"limit": 12, **camera_params}
+        if window_minutes:
+            params["since_minutes"] = window_minutes
+        try:
+            res = requests.get(f"{BACKEND_URL}/recent", params=params, timeout=10)
+            items = res.json().get("items", [])
+        except Exception as e:
+            st.error(f"Error connecting to backend: {e}")
+            items = None
         
-        if not found_any:
-            st.info("No common items detected recently.")
+        if items:
+            for item in items:
+                st.subheader(f"Recent {item['name']}")
+                # The browser loads the images in parallel
+                st.image(f"{BACKEND_URL}{item['image_url']}?w=320", width=300)
+                st.write(f"Location: {item['location']} at {item['time']}")
+                st.markdown("---")
+        elif items is not None:
+            st.info("No items detected recently.")
 
 with tab4:
     st.header("🏠 3D Room Map")
@@ -36,6 +36,19 @@ else:
 # Tabs
 tab1, tab2, tab3 = st.tabs(["Upload & Analyze", "Live Feed (Demo)", "Find My Stuff"])
 
+def wait_for_job(result_url, timeout=60, interval=0.5):
+    """
+    Poll a background analysis job until it finishes (or the timeout expires).
+    """
+    headers = {"ngrok-skip-browser-warning": "true"}
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        res = requests.get(result_url, headers=headers, timeout=10)
+        if res.status_code != 202:
+            return res
+        time.sleep(interval)
+    return None
+
 def get_image_bytes(url):
     """
     Fetch image from backend (Ngrok) with custom headers to bypass warning page.
@@ -85,6 +98,12 @@ with tab1:
                     status_text.text("Processing AI response...")
                     
                     if res.status_code == 200:
+                        status_text.text("Waiting for AI analysis...")
+                        res = wait_for_job(f"{backend_url}{res.json()['result_url']}")
+
+                    if res is None:
+                        st.error("Analysis timed out")
+                    elif res.status_code == 200:
                         data = res.json()
                         progress_bar.progress(100)
                         status_text.success("Complete!")
@@ -97,7 +116,7 @@ with tab1:
                                 # Fix URL if relative
                                 img_url = data['annotated_url']
                                 if img_url.startswith("/"):
-                                    img_url = f"{backend_url}{img_url}"
+                                    img_url = f"{backend_url}{img_url}?w=640"
                                 
                                 # Use proxy fetch to bypass ngrok warning
                                 img_bytes = get_image_bytes(img_url)
@@ -143,14 +162,15 @@ with tab3:
             if query:
                 try:
                     with st.spinner("Searching..."):
-                        res = requests.get(f"{backend_url}/query", params={"q": query}, timeout=10)
+                        # Only fetch the first page (latest 20) over the tunnel
+                        res = requests.get(f"{backend_url}/query", params={"q": query, "limit": 20}, timeout=10)
                         
                         if res.status_code == 200:
                             results = res.json()
                             if "items" in results and results["items"]:
-                                # Limit results to 20 to prevent overload
-                                items = results["items"][:20]
-                                st.success(f"Found {len(results['items'])} items matching '{query}' (Showing latest {len(items)})")
+                                items = results["items"]
+                                more = " (more available)" if results.get("next_before") else ""
+                                st.success(f"Showing latest {len(items)} items matching '{query}'{more}")
                                 
                                 for item in items:
                                     with st.container():
@@ -159,7 +179,8 @@ with tab3:
                                             # Construct full image URL
                                             img_url = item.get("image_url", "")
                                             if img_url.startswith("/"):
-                                                img_url = f"{backend_url}{img_url}"
+                                                # Thumbnail: full captures are megabytes over ngrok
+                                                img_url = f"{backend_url}{img_url}?w=320"
                                             
                                             # Use proxy fetch
                                             img_bytes = get_image_bytes(img_url)
@@ -181,6 +202,20 @@ with tab3:
             else:
                 st.warning("Please enter a search term.")
 
+        st.divider()
+        if st.button("Show Recent Detections"):
+            # One round trip for the latest sighting of every class
+            try:
+                headers = {"ngrok-skip-browser-warning": "true"}
+                res = requests.get(f"{backend_url}/recent", params={"limit": 12}, headers=headers, timeout=10)
+                recent = res.json().get("items", []) if res.status_code == 200 else []
+                if recent:
+                    st.dataframe(pd.DataFrame(recent)[["name", "location", "confidence", "time"]], use_container_width=True)
+                else:
+                    st.info("No items detected yet.")
+            except Exception as e:
+                st.error(f"Connection error: {e}")
+
 with tab4:
     st.header("🏠 3D Room Map")
     st.info("Upload your room's 3D model (.glb) to visualize the environment. You can use apps like Polycam or LiDAR scanners to generate this.")
@@ -37,6 +37,15 @@ def test_chinese_alias():
         res = requests.post(f"{BASE_URL}/upload", files=files)
     
     print("Upload response:", res.json())
+
+    # Analysis runs in the background; wait for the job to finish
+    result_url = f"{BASE_URL}{res.json()['result_url']}"
+    for i in range(60):
+        res = requests.get(result_url)
+        if res.status_code != 202:
+            break
+        time.sleep(1)
+    print("Analysis result:", res.json())
     
     # Query for "公交车" (alias for bus)
     print("Querying for '公交车'...")